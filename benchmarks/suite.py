@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Suíte de benchmarks de desempenho para src/stats, src/models e src/data.
+
+Cada benchmark é medido em vários tamanhos de entrada: o tempo é o melhor
+de `repeat` rodadas do `timeit` (tempo por chamada) e a memória é o pico de
+uma chamada isolada, conforme o campo `memory` de cada caso:
+
+- "python" (padrão): pico do `tracemalloc`, que vê o Python e o NumPy;
+- "arrow": pico do `tracemalloc` somado ao pico do pool de memória do
+  pyarrow, amostrado a cada milissegundo (as alocações do pyarrow não
+  passam pelo `tracemalloc`; picos mais curtos que a amostragem podem
+  escapar). Usado pelos casos de Parquet
+  (`load_nyc_311`, `read_nyc_311_partition`);
+- None: sem medida de memória (`import_time`, que roda em outro processo).
+
+Os resultados são comparados com uma baseline em JSON e a execução falha se
+algum caso ficar mais lento ou, quando há medida, usar mais memória do que o
+limite permitido.
+
+Uso:
+  python -m benchmarks.suite [--save] [--baseline CAMINHO] [--threshold 0.25]
+                             [--memory-threshold 0.25] [--filter NOME]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data import loaders
+from src.models.evaluate import calibration_report, classification_report_proba
+from src.stats import cache, hypothesis, power, probability
+
+BENCH_DIR = Path(".benchmarks")
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+LATEST = BENCH_DIR / "latest.json"
+
+
+@dataclass
+class Benchmark:
+    """
+    Um caso de benchmark: `setup(size)` monta os argumentos de `fn`.
+
+    `sizes` normalmente são tamanhos de entrada, mas podem ser quaisquer
+    rótulos aceitos por `setup` (por exemplo, nomes de módulos). `memory`
+    escolhe como o pico de memória é medido (veja o docstring do módulo).
+    """
+
+    name: str
+    fn: Callable
+    setup: Callable
+    sizes: tuple
+    memory: Optional[str] = "python"
+
+
+def _rng():
+    return np.random.default_rng(1234)
+
+
+def _two_samples(size):
+    rng = _rng()
+    return rng.normal(0.0, 1.0, size), rng.normal(0.1, 1.0, size)
+
+
+def _cached_ttest(a, b):
+    # Após a primeira chamada, cada repetição custa só o hash das entradas.
+    # Um cache já ligado pelo usuário (STATS_CACHE) fica como está.
+    if cache.is_enabled():
+        return hypothesis.two_sample_ttest(a, b)
+    cache.enable()
+    try:
+        return hypothesis.two_sample_ttest(a, b)
+    finally:
+        cache.disable()
+
+
+def _contingency(size):
+    return (_rng().integers(5, 500, size=(size, size)),)
+
+
+def _normal_points(size):
+    return (_rng().normal(size=size).tolist(),)
+
+
+def _normal_cdf_loop(points):
+    for x in points:
+        probability.normal_cdf(x)
+
+
+def _values(size):
+    values = _rng().normal(size=size)
+    values[::97] = np.nan
+    return (values,)
+
+
+def _labels_scores(size):
+    rng = _rng()
+    y_true = rng.integers(0, 2, size=size)
+    y_proba = np.clip(0.3 * y_true + rng.normal(0.35, 0.2, size=size), 0, 1)
+    return y_true, y_proba
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _sketch_quantiles(values):
+    # Em lotes, como em dados lidos por chunks que não cabem na memória.
+    sketch = probability.QuantileSketch()
+    for chunk in np.array_split(values, max(values.size // 100_000, 1)):
+        sketch.update(chunk)
+    return sketch.quantile(QUANTILES)
+
+
+def _np_quantiles(values):
+    return np.nanquantile(values, QUANTILES)
+
+
+def _effect_grid(size):
+    # `size` pontos de tamanho de efeito x 3 alphas x 3 poderes x 3 razões.
+    effect = np.linspace(0.05, 1.5, size)[:, None, None, None]
+    alpha = np.array([0.01, 0.05, 0.1])[:, None, None]
+    target = np.array([0.8, 0.9, 0.95])[:, None]
+    return effect, alpha, target, np.array([1.0, 2.0, 3.0])
+
+
+def _binomial_counts(size):
+    return _rng().integers(0, 1_000, size=size), 1_000, 0.3
+
+
+def _binomial_table_cdf(k, n, p):
+    # Em um laço de monitoramento, a tabela já está no cache após a 1ª chamada.
+    return probability.binomial_table(n, p).cdf(k)
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        return None
+
+
+def _nyc_csv(size):
+    rng = _rng()
+    frame = pd.DataFrame(
+        {
+            "unique_key": np.arange(size),
+            "created_date": pd.date_range("2024-01-01", periods=size, freq="min"),
+            "complaint_type": rng.choice(["Noise", "Heat", "Parking"], size=size),
+            "borough": rng.choice(["BRONX", "BROOKLYN", "QUEENS"], size=size),
+        }
+    )
+    return frame.to_csv(index=False)
+
+
+def _nyc_download(size):
+    text = _nyc_csv(size)
+    return (lambda url, params, timeout: _FakeResponse(text),)
+
+
+def _load_nyc_311(request_fn):
+    # Silencia as mensagens de progresso do loader a cada repetição.
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaders.load_nyc_311(limit=0, request_fn=request_fn)
+
+
+def _cached_csv(size):
+    path = loaders.EXTERNAL / f"bench_{size}.csv"
+    path.write_text(_nyc_csv(size), encoding="utf-8")
+    return (path,)
+
+
+def _nyc_dataset(size):
+    frame = pd.read_csv(io.StringIO(_nyc_csv(size)))
+    shutil.rmtree(loaders.nyc_311_path(), ignore_errors=True)
+    loaders.write_nyc_311(frame)
+    return ["2024-01"], ["BRONX"]
+
+
+def _read_nyc_partition(months, boroughs):
+    # Só os arquivos de um mês e um distrito são abertos.
+    return loaders.read_nyc_311(months=months, boroughs=boroughs)
+
+
+def _read_cached_csv(path):
+    for _ in loaders.iter_csv_chunks(path, chunksize=50_000):
+        pass
+
+
+# Módulo importado -> dependências pesadas que ele não pode carregar sozinho
+LAZY_IMPORTS = {
+    "src.stats.probability": ("scipy", "pandas"),
+    "src.stats.hypothesis": ("scipy", "pandas"),
+    "src.stats.power": ("scipy",),
+    "src.models.evaluate": ("sklearn", "scipy"),
+    "src.data.loaders": ("pandas", "requests", "pyarrow"),
+    "src.viz.plots": ("matplotlib",),
+}
+
+
+def _import_module(name):
+    forbidden = LAZY_IMPORTS[name]
+    code = (
+        f"import sys, {name}; "
+        f"loaded = [m for m in {forbidden!r} if m in sys.modules]; "
+        "sys.exit(f'importados no carregamento: {loaded}' if loaded else 0)"
+    )
+    return (code,)
+
+
+def _run_python(code):
+    # Processo novo: mede o custo real de importação, sem cache de sys.modules.
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+BENCHMARKS = [
+    Benchmark(
+        "two_sample_ttest",
+        hypothesis.two_sample_ttest,
+        _two_samples,
+        (1_000, 100_000, 1_000_000),
+    ),
+    Benchmark(
+        "two_sample_ttest_cached",
+        _cached_ttest,
+        _two_samples,
+        (1_000, 100_000, 1_000_000),
+    ),
+    Benchmark(
+        "permutation_test",
+        hypothesis.permutation_test,
+        _two_samples,
+        (100, 1_000, 10_000),
+    ),
+    Benchmark(
+        "chi_square_independence",
+        hypothesis.chi_square_independence,
+        _contingency,
+        (2, 20, 200),
+    ),
+    Benchmark("normal_cdf", _normal_cdf_loop, _normal_points, (10, 1_000)),
+    Benchmark(
+        "sample_mean", probability.sample_mean, _values, (1_000, 100_000, 1_000_000)
+    ),
+    # Referência exata para o esboço de quantis.
+    Benchmark("np_quantile", _np_quantiles, _values, (100_000, 1_000_000)),
+    Benchmark("quantile_sketch", _sketch_quantiles, _values, (100_000, 1_000_000)),
+    Benchmark("ttest_sample_size", power.ttest_sample_size, _effect_grid, (1, 100)),
+    Benchmark(
+        "binomial_cdf", probability.binomial_cdf, _binomial_counts, (1_000, 1_000_000)
+    ),
+    Benchmark(
+        "binomial_table_cdf", _binomial_table_cdf, _binomial_counts, (1_000, 1_000_000)
+    ),
+    Benchmark(
+        "classification_report_proba",
+        classification_report_proba,
+        _labels_scores,
+        (1_000, 100_000, 1_000_000),
+    ),
+    Benchmark(
+        "calibration_report",
+        calibration_report,
+        _labels_scores,
+        (1_000, 100_000, 1_000_000),
+    ),
+    Benchmark(
+        "load_nyc_311", _load_nyc_311, _nyc_download, (1_000, 50_000), memory="arrow"
+    ),
+    Benchmark("read_cached_csv", _read_cached_csv, _cached_csv, (1_000, 50_000)),
+    Benchmark(
+        "read_nyc_311_partition",
+        _read_nyc_partition,
+        _nyc_dataset,
+        (1_000, 50_000, 500_000),
+        memory="arrow",
+    ),
+    # Aqui o "tamanho" é o nome do módulo importado.
+    Benchmark(
+        "import_time", _run_python, _import_module, tuple(LAZY_IMPORTS), memory=None
+    ),
+]
+
+
+@contextlib.contextmanager
+def _arrow_peak(interval=0.001):
+    """Amostra o pool do pyarrow em segundo plano; produz {"bytes": pico}."""
+    import pyarrow as pa
+
+    start = pa.total_allocated_bytes()
+    peak = {"bytes": 0}
+    done = threading.Event()
+
+    def sample():
+        while True:
+            peak["bytes"] = max(peak["bytes"], pa.total_allocated_bytes() - start)
+            if done.wait(interval):
+                break
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        yield peak
+    finally:
+        done.set()
+        thread.join()
+        peak["bytes"] = max(peak["bytes"], pa.total_allocated_bytes() - start)
+
+
+def measure(fn, args, repeat=3, memory="python"):
+    """
+    Mede o melhor tempo por chamada e o pico de memória de `fn(*args)`.
+
+    `memory` é "python", "arrow" ou None (``peak_bytes`` fica None).
+    """
+    if memory not in ("python", "arrow", None):
+        raise ValueError("memory must be 'python', 'arrow' or None.")
+    timer = timeit.Timer(lambda: fn(*args))
+    # `autorange` escolhe quantas chamadas cabem em ~0,2 s por rodada.
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    if memory is None:
+        return {"seconds": seconds, "peak_bytes": None, "loops": number}
+
+    arrow = _arrow_peak() if memory == "arrow" else contextlib.nullcontext()
+    tracemalloc.start()
+    try:
+        with arrow as arrow_peak:
+            fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if arrow_peak is not None:
+        peak += arrow_peak["bytes"]
+    return {"seconds": seconds, "peak_bytes": peak, "loops": number}
+
+
+def run_suite(benchmarks=BENCHMARKS, name_filter=None, repeat=3, echo=True):
+    """Executa os benchmarks e retorna {"nome[tamanho]": medidas}."""
+    results = {}
+    saved_dirs = (loaders.RAW, loaders.EXTERNAL, loaders.PROCESSED)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Os loaders escrevem em um diretório temporário, não em data/.
+        loaders.RAW = loaders.EXTERNAL = loaders.PROCESSED = Path(tmp)
+        try:
+            for bench in benchmarks:
+                if name_filter and name_filter not in bench.name:
+                    continue
+                for size in bench.sizes:
+                    key = f"{bench.name}[{size}]"
+                    results[key] = measure(
+                        bench.fn, bench.setup(size), repeat=repeat, memory=bench.memory
+                    )
+                    if echo:
+                        r = results[key]
+                        peak = r["peak_bytes"]
+                        peak = "-" if peak is None else f"{peak / 2**20:.2f}"
+                        print(
+                            f"  {key:<40} {r['seconds'] * 1e3:>12.4f} ms"
+                            f" {peak:>10} MiB"
+                        )
+        finally:
+            loaders.RAW, loaders.EXTERNAL, loaders.PROCESSED = saved_dirs
+    return results
+
+
+# Diferenças de memória menores que isso são ruído do alocador.
+MIN_MEMORY_DELTA = 64 * 1024
+
+
+def compare_results(current, baseline, threshold=0.25, memory_threshold=0.25):
+    """
+    Compara os resultados com a baseline.
+
+    Retorna a lista de regressões (mensagens); um caso regride quando o tempo
+    ou o pico de memória ultrapassa o da baseline em mais de `threshold` ou
+    `memory_threshold` (fração, 0.25 = 25%). Aumentos de memória abaixo de
+    `MIN_MEMORY_DELTA` bytes, casos sem medida de memória e casos sem
+    baseline são ignorados.
+    """
+    regressions = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if now["seconds"] > before["seconds"] * (1 + threshold):
+            ratio = now["seconds"] / before["seconds"]
+            regressions.append(f"{key}: tempo {ratio:.2f}x da baseline")
+        if now["peak_bytes"] is None or before["peak_bytes"] is None:
+            continue
+        limit = max(
+            before["peak_bytes"] * (1 + memory_threshold),
+            before["peak_bytes"] + MIN_MEMORY_DELTA,
+        )
+        if now["peak_bytes"] > limit:
+            ratio = now["peak_bytes"] / max(before["peak_bytes"], 1)
+            regressions.append(f"{key}: memória {ratio:.2f}x da baseline")
+    return regressions
+
+
+def _environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def save_results(path, results):
+    """Grava os resultados em JSON junto com a descrição do ambiente."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"environment": _environment(), "results": results}
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+def load_results(path):
+    """Lê os resultados gravados por `save_results`."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python tasks.py bench")
+    parser.add_argument("--save", action="store_true", help="grava como baseline")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.25)
+    parser.add_argument("--filter", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    print(f"  {'benchmark':<40} {'tempo/chamada':>15} {'pico':>14}")
+    results = run_suite(name_filter=options.filter, repeat=options.repeat)
+    save_results(LATEST, results)
+
+    if options.save:
+        save_results(options.baseline, results)
+        print(f"\nBaseline salva em: {options.baseline}")
+        return 0
+
+    if not options.baseline.exists():
+        print(f"\nNenhuma baseline em {options.baseline}; use --save para criar uma.")
+        return 0
+
+    regressions = compare_results(
+        results,
+        load_results(options.baseline),
+        threshold=options.threshold,
+        memory_threshold=options.memory_threshold,
+    )
+    if regressions:
+        print("\nERRO: regressões de desempenho encontradas:", file=sys.stderr)
+        for message in regressions:
+            print(f"  - {message}", file=sys.stderr)
+        return 1
+    print("\nNenhuma regressão em relação à baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
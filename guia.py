@@ -7,6 +7,8 @@ import sys
 import shutil
 from pathlib import Path
 
+from notebook_runner import execute_notebook_in_process
+
 
 def print_header(title):
     """Imprime um cabeçalho formatado."""
@@ -114,75 +116,6 @@ def execute_notebook_with_available_tool(notebook_path, runner_type="auto"):
     return False, f"Ferramenta de execução '{runner_type}' não reconhecida"
 
 
-def convert_notebook_to_script(notebook_path):
-    """Converte um notebook para um script Python executável."""
-    try:
-        import json
-
-        with open(notebook_path, "r", encoding="utf-8") as f:
-            notebook = json.load(f)
-
-        script_lines = []
-        script_lines.append(
-            f"# Convertido automaticamente do notebook: {notebook_path.name}"
-        )
-        script_lines.append("# Execute este script como alternativa ao notebook\n")
-
-        for cell in notebook.get("cells", []):
-            if cell.get("cell_type") == "code":
-                source = cell.get("source", [])
-                if source:
-                    script_lines.append("# " + "-" * 50)
-                    # Junta as linhas de código da célula
-                    if isinstance(source, list):
-                        code = "".join(source)
-                    else:
-                        code = source
-                    script_lines.append(code)
-                    script_lines.append("")
-
-        script_path = notebook_path.parent / f"{notebook_path.stem}_converted.py"
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(script_lines))
-
-        return script_path
-
-    except Exception as e:
-        return None
-
-
-def execute_notebook_as_script(notebook_path):
-    """Executa um notebook convertendo-o para script Python."""
-    script_path = convert_notebook_to_script(notebook_path)
-
-    if not script_path:
-        return False, "Erro ao converter notebook para script Python"
-
-    try:
-        print(f"   Convertido para script: {script_path.name}")
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            capture_output=True,
-            text=True,
-            cwd=notebook_path.parent,
-        )
-
-        # Remove o arquivo de script temporário
-        script_path.unlink()
-
-        if result.stdout:
-            print("--- Saída do script ---")
-            print(result.stdout)
-
-        return True, "Notebook executado com sucesso como script Python"
-
-    except subprocess.CalledProcessError as e:
-        if script_path.exists():
-            script_path.unlink()  # Remove o arquivo temporário
-        return False, f"Erro ao executar script Python: {e}"
-
-
 def run_command(command_list):
     """Executa um comando (como lista) e trata erros."""
     try:
@@ -273,9 +206,9 @@ def list_and_run_notebooks_menu():
                 # Executa o notebook usando a ferramenta disponível
                 if not runners or runners[0]["name"] == "install_jupyter":
                     print(
-                        "❌ Jupyter não disponível. Tentando executar como script Python..."
+                        "❌ Jupyter não disponível. Executando no executor interno..."
                     )
-                    success, message = execute_notebook_as_script(selected_notebook)
+                    success, message = execute_notebook_in_process(selected_notebook)
                     if success:
                         print(f"\n✓ {message}")
                     else:
@@ -291,8 +224,10 @@ def list_and_run_notebooks_menu():
                         print(f"\n✓ {message}")
                     else:
                         print(f"\n❌ {message}")
-                        print("   Tentando executar como script Python...")
-                        success, message = execute_notebook_as_script(selected_notebook)
+                        print("   Tentando executar no executor interno...")
+                        success, message = execute_notebook_in_process(
+                            selected_notebook
+                        )
                         if success:
                             print(f"\n✓ {message}")
                         else:
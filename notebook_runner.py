@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+Executor de notebooks com interpretadores "quentes".
+
+Em vez de converter cada notebook para um script temporário e rodá-lo em um
+interpretador novo (pagando a importação de pandas/scipy/sklearn a cada vez),
+este módulo mantém um pool de processos que já importaram a pilha científica.
+Cada notebook roda em um namespace isolado dentro de um desses processos; a
+saída de cada célula é transmitida ao vivo para o processo principal, junto
+com o tempo de execução de cada célula.
+
+Entre um notebook e outro o worker restaura o diretório atual, `sys.path`, o
+estado dos geradores globais (`random` e `np.random`), as opções do pandas,
+os `rcParams` do matplotlib e descarta os módulos do projeto importados pelo
+notebook. Continuam compartilhados: alterações feitas em módulos da pilha
+pré-importada (por exemplo, monkeypatch em `pandas`), variáveis de ambiente,
+filtros de logging e recursos abertos e não fechados pelo notebook.
+
+Uso:
+  python notebook_runner.py [--workers N] [--timeout S] [notebook ...]
+"""
+import argparse
+import ast
+import contextlib
+import importlib
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+import traceback
+import warnings
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from pathlib import Path
+
+# Módulos importados uma única vez em cada worker
+DEFAULT_PRELOAD = (
+    "numpy",
+    "pandas",
+    "scipy.stats",
+    "sklearn",
+    "statsmodels.api",
+    "matplotlib.pyplot",
+    "seaborn",
+)
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class NotebookResult:
+    """Resultado da execução de um notebook no pool."""
+
+    path: Path
+    ok: bool = False
+    seconds: float = 0.0
+    cell_seconds: list = field(default_factory=list)
+    error: str = ""
+
+
+def read_code_cells(notebook_path):
+    """Retorna o código das células de código do notebook, na ordem."""
+    with open(notebook_path, "r", encoding="utf-8") as f:
+        notebook = json.load(f)
+    cells = []
+    for cell in notebook.get("cells", []):
+        if cell.get("cell_type") != "code":
+            continue
+        source = cell.get("source", [])
+        if isinstance(source, list):
+            source = "".join(source)
+        # Comandos mágicos (%, !) só existem no IPython; são ignorados aqui.
+        lines = [
+            line
+            for line in source.splitlines()
+            if not line.lstrip().startswith(("%", "!"))
+        ]
+        cells.append("\n".join(lines))
+    return cells
+
+
+class _PipeWriter:
+    """Arquivo de texto que envia cada escrita ao processo principal."""
+
+    def __init__(self, conn, task_id, cell_index, stream):
+        self.conn = conn
+        self.task_id = task_id
+        self.cell_index = cell_index
+        self.stream = stream
+
+    def write(self, text):
+        if text:
+            self.conn.send(("output", self.task_id, self.cell_index, self.stream, text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _display(*objs, **kwargs):
+    """Substituto de `IPython.display.display`: imprime cada objeto."""
+    for obj in objs:
+        print(obj)
+
+
+def _run_cell(code, filename, namespace):
+    """Executa uma célula e exibe o valor da última expressão, como no Jupyter."""
+    tree = ast.parse(code, filename=filename)
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, filename, "exec"), namespace)
+    if last is not None:
+        value = eval(compile(last, filename, "eval"), namespace)
+        if value is not None:
+            print(repr(value))
+
+
+def _pandas_options(wrapper, prefix=""):
+    """Percorre `pd.options` e gera pares (chave, valor)."""
+    for name in dir(wrapper):
+        value = getattr(wrapper, name)
+        if type(value).__name__ == "DictWrapper":
+            yield from _pandas_options(value, f"{prefix}{name}.")
+        else:
+            yield f"{prefix}{name}", value
+
+
+def _save_global_state():
+    """Captura o estado de processo que um notebook costuma alterar."""
+    state = {
+        "cwd": os.getcwd(),
+        "path": list(sys.path),
+        "modules": set(sys.modules),
+        "random": random.getstate(),
+    }
+    if "numpy" in sys.modules:
+        state["numpy"] = sys.modules["numpy"].random.get_state()
+    if "pandas" in sys.modules:
+        with warnings.catch_warnings():
+            # Ler opções obsoletas emite avisos.
+            warnings.simplefilter("ignore")
+            state["pandas"] = dict(_pandas_options(sys.modules["pandas"].options))
+    if "matplotlib" in sys.modules:
+        state["rc_params"] = sys.modules["matplotlib"].rcParams.copy()
+    return state
+
+
+def _restore_global_state(state):
+    """Restaura o que `_save_global_state` capturou, para o próximo notebook."""
+    os.chdir(state["cwd"])
+    sys.path[:] = state["path"]
+    random.setstate(state["random"])
+    if "numpy" in state:
+        sys.modules["numpy"].random.set_state(state["numpy"])
+    if "pandas" in state:
+        pd = sys.modules["pandas"]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for key, value in state["pandas"].items():
+                if pd.get_option(key) is not value:
+                    pd.set_option(key, value)
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].close("all")
+    if "rc_params" in state:
+        sys.modules["matplotlib"].rcParams.update(state["rc_params"])
+    # Módulos do projeto importados pelo notebook (talvez com monkeypatch)
+    # são recarregados do zero pelo próximo.
+    for name in set(sys.modules) - state["modules"]:
+        module_file = getattr(sys.modules[name], "__file__", None) or ""
+        if Path(module_file).resolve().is_relative_to(ROOT_DIR):
+            del sys.modules[name]
+
+
+def _execute_notebook(conn, task_id, notebook_path):
+    """Executa todas as células de um notebook em um namespace novo."""
+    notebook_path = Path(notebook_path)
+    namespace = {
+        "__name__": "__main__",
+        "__file__": str(notebook_path),
+        "display": _display,
+    }
+    saved = _save_global_state()
+
+    try:
+        cells = read_code_cells(notebook_path)
+        os.chdir(notebook_path.parent)
+        with warnings.catch_warnings():
+            for index, code in enumerate(cells):
+                start = time.perf_counter()
+                out = _PipeWriter(conn, task_id, index, "stdout")
+                err = _PipeWriter(conn, task_id, index, "stderr")
+                try:
+                    with (
+                        contextlib.redirect_stdout(out),
+                        contextlib.redirect_stderr(err),
+                    ):
+                        _run_cell(code, f"<{notebook_path.name}:{index}>", namespace)
+                except BaseException:  # noqa: BLE001 - reportado ao processo principal
+                    elapsed = time.perf_counter() - start
+                    conn.send(("cell", task_id, index, elapsed, False))
+                    return False, traceback.format_exc()
+                conn.send(("cell", task_id, index, time.perf_counter() - start, True))
+        return True, ""
+    except Exception:  # noqa: BLE001 - notebook ilegível, por exemplo
+        return False, traceback.format_exc()
+    finally:
+        _restore_global_state(saved)
+
+
+def _worker_main(conn, preload):
+    """Laço principal de um worker: importa a pilha e atende notebooks."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    conn.send(("ready",))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, notebook_path = task
+        start = time.perf_counter()
+        ok, error = _execute_notebook(conn, task_id, notebook_path)
+        conn.send(("done", task_id, ok, error, time.perf_counter() - start))
+
+
+class WarmKernelPool:
+    """
+    Pool de interpretadores com a pilha científica já importada.
+
+    Os workers são criados com o método "spawn" e importam `preload` uma vez;
+    depois disso cada notebook paga apenas o custo das próprias células. Um
+    notebook que excede o `timeout` tem seu worker encerrado; o worker é
+    recriado quando ainda há notebooks na fila (ou no próximo `run`).
+    """
+
+    def __init__(self, workers=None, preload=DEFAULT_PRELOAD):
+        self.workers = workers or os.cpu_count() or 1
+        self.preload = tuple(preload)
+        self._ctx = mp.get_context("spawn")
+        self._procs = {}
+        self._conns = {}
+        self._ready = set()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Inicia (ou completa) os workers do pool."""
+        for worker_id in range(self.workers):
+            if worker_id not in self._procs:
+                self._spawn(worker_id)
+
+    def _spawn(self, worker_id):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.preload), daemon=True
+        )
+        proc.start()
+        child_conn.close()
+        self._procs[worker_id] = proc
+        self._conns[worker_id] = parent_conn
+
+    def _kill(self, worker_id):
+        proc = self._procs.pop(worker_id)
+        conn = self._conns.pop(worker_id)
+        self._ready.discard(worker_id)
+        proc.terminate()
+        proc.join()
+        conn.close()
+
+    def close(self):
+        """Encerra todos os workers."""
+        for worker_id in list(self._procs):
+            try:
+                self._conns[worker_id].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self._procs[worker_id].join(timeout=5)
+            self._kill(worker_id)
+
+    def run(self, notebooks, timeout=None, echo=True):
+        """
+        Executa os notebooks no pool e retorna um `NotebookResult` por notebook.
+
+        Com `echo`, a saída das células é impressa ao vivo com o nome do
+        notebook como prefixo, seguida do tempo de cada célula.
+        """
+        self.start()
+        paths = [Path(p).resolve() for p in notebooks]
+        results = [NotebookResult(path=p) for p in paths]
+        pending = list(range(len(paths)))
+        # Só recebem notebooks os workers que já terminaram o aquecimento.
+        idle = set(self._ready)
+        running = {}  # worker_id -> (task_id, início)
+        partial = {}  # task_id -> linha incompleta de saída
+
+        def emit(task_id, text):
+            prefix = f"[{paths[task_id].stem}] "
+            buffered = partial.get(task_id, "") + text
+            *lines, partial[task_id] = buffered.split("\n")
+            for line in lines:
+                print(prefix + line, flush=True)
+
+        def finish(worker_id, task_id, ok, error, seconds):
+            running.pop(worker_id, None)
+            if partial.get(task_id):
+                emit(task_id, "\n")
+            result = results[task_id]
+            result.ok, result.error, result.seconds = ok, error, seconds
+            if echo:
+                status = "ok" if ok else "erro"
+                print(f"[{paths[task_id].stem}] concluído ({status}) em {seconds:.2f}s")
+                if error:
+                    print(error, file=sys.stderr)
+
+        while pending or running:
+            for worker_id in sorted(idle):
+                if not pending:
+                    break
+                task_id = pending.pop(0)
+                self._conns[worker_id].send((task_id, str(paths[task_id])))
+                idle.discard(worker_id)
+                running[worker_id] = (task_id, time.perf_counter())
+
+            conn_to_worker = {conn: w for w, conn in self._conns.items()}
+            for conn in wait(list(conn_to_worker), timeout=0.2):
+                worker_id = conn_to_worker[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    if worker_id not in running:
+                        self._kill(worker_id)
+                        raise RuntimeError(
+                            "um worker do pool falhou durante a inicialização."
+                        )
+                    # O worker morreu no meio do notebook: substitui-o.
+                    task_id, started = running[worker_id]
+                    self._kill(worker_id)
+                    if pending:
+                        self._spawn(worker_id)
+                    finish(
+                        worker_id,
+                        task_id,
+                        False,
+                        "worker encerrado inesperadamente",
+                        time.perf_counter() - started,
+                    )
+                    continue
+                kind = message[0]
+                if kind == "ready":
+                    self._ready.add(worker_id)
+                    idle.add(worker_id)
+                elif kind == "output" and echo:
+                    emit(message[1], message[4])
+                elif kind == "cell":
+                    _, task_id, index, seconds, ok = message
+                    results[task_id].cell_seconds.append(seconds)
+                    if echo:
+                        if partial.get(task_id):
+                            emit(task_id, "\n")
+                        print(
+                            f"[{paths[task_id].stem}] célula {index} "
+                            f"({'ok' if ok else 'erro'}): {seconds:.2f}s",
+                            flush=True,
+                        )
+                elif kind == "done":
+                    _, task_id, ok, error, seconds = message
+                    finish(worker_id, task_id, ok, error, seconds)
+                    idle.add(worker_id)
+
+            if timeout is not None:
+                now = time.perf_counter()
+                for worker_id, (task_id, started) in list(running.items()):
+                    if now - started > timeout:
+                        self._kill(worker_id)
+                        if pending:
+                            self._spawn(worker_id)
+                        finish(
+                            worker_id,
+                            task_id,
+                            False,
+                            f"excedeu {timeout}s",
+                            now - started,
+                        )
+
+        return results
+
+
+def run_notebooks(notebooks, workers=None, timeout=None, echo=True):
+    """Atalho: executa os notebooks em um pool temporário."""
+    notebooks = list(notebooks)
+    workers = workers or min(len(notebooks), os.cpu_count() or 1) or 1
+    with WarmKernelPool(workers=workers) as pool:
+        return pool.run(notebooks, timeout=timeout, echo=echo)
+
+
+def execute_notebook_in_process(notebook_path):
+    """Executa um notebook no executor interno (sem Jupyter nem script temporário)."""
+    notebook_path = Path(notebook_path)
+    print(f"   Executando células de {notebook_path.name}...")
+    (result,) = run_notebooks([notebook_path], workers=1)
+    if result.ok:
+        return True, (
+            f"Notebook executado com sucesso em {result.seconds:.1f}s "
+            f"({len(result.cell_seconds)} células)"
+        )
+    return (
+        False,
+        f"Erro ao executar o notebook: {result.error.strip().splitlines()[-1]}",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("notebooks", nargs="*", type=Path)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None)
+    options = parser.parse_args()
+
+    targets = options.notebooks or sorted(Path("notebooks").rglob("*.ipynb"))
+    outcome = run_notebooks(targets, workers=options.workers, timeout=options.timeout)
+    sys.exit(0 if all(r.ok for r in outcome) else 1)
@@ -1,12 +1,22 @@
 ﻿# -*- coding: utf-8 -*-
-"""Data loading helpers for the project."""
+"""
+Data loading helpers for the project.
+
+pandas and requests are imported inside the loaders, so importing this
+module does not pay for them until data is actually loaded.
+"""
+from __future__ import annotations
+
 from pathlib import Path
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
 
-import pandas as pd
-import requests
 from io import StringIO
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+from src.instrumentation import instrumented, record_bytes, span
+
 # Define os diretórios de dados, garantindo que existam.
 DATA_DIR = Path("data")
 RAW = DATA_DIR / "raw"
@@ -17,7 +27,11 @@ RAW.mkdir(parents=True, exist_ok=True)
 EXTERNAL.mkdir(parents=True, exist_ok=True)
 PROCESSED.mkdir(parents=True, exist_ok=True)
 
+# Colunas de partição (estilo Hive) do dataset NYC 311 em Parquet.
+NYC_311_PARTITIONS = ("created_month", "borough")
+
 
+@instrumented("data.load_california_housing")
 def load_california_housing(
     fetch_fn: Optional[Callable[..., object]] = None,
 ) -> pd.DataFrame:
@@ -28,34 +42,206 @@ def load_california_housing(
         fetch_fn = fetch_california_housing
 
     print("Baixando o dataset California Housing...")
-    ds = fetch_fn(as_frame=True)
+    with span("io.fetch_california_housing"):
+        ds = fetch_fn(as_frame=True)
     df = ds.frame
 
     output_path = RAW / "california_housing.csv"
-    df.to_csv(output_path, index=False)
+    with span("io.write_csv", items=len(df)):
+        df.to_csv(output_path, index=False)
     print(f"Dataset salvo em: {output_path}")
 
     return df
 
 
+@instrumented("data.load_nyc_311", size=lambda limit=100_000, **_: limit)
 def load_nyc_311(
-    limit: int = 100_000, request_fn: Optional[Callable[..., object]] = None
+    limit: int = 100_000,
+    request_fn: Optional[Callable[..., object]] = None,
+    mode: str = "replace",
 ) -> pd.DataFrame:
-    """Fetch NYC 311 requests via the public API respecting the limit."""
+    """
+    Fetch NYC 311 requests via the public API respecting the limit.
+
+    The rows are stored as a Hive-style partitioned Parquet dataset under
+    ``EXTERNAL / "nyc_311"`` (see `write_nyc_311`); read it back, or just a
+    few partitions, with `read_nyc_311`. Each call is a full download, so by
+    default the partitions it covers are replaced; pass ``mode="append"``
+    for incremental loads of new records only.
+    """
     base = "https://data.cityofnewyork.us/resource/erm2-nwe9.csv"
     params = {"": limit}
 
+    import pandas as pd
+
     if request_fn is None:
+        import requests
+
         request_fn = requests.get
 
     print(f"Baixando {limit} registros do NYC 311...")
-    response = request_fn(base, params=params, timeout=180)
-    response.raise_for_status()
+    with span("io.http_get"):
+        response = request_fn(base, params=params, timeout=180)
+        response.raise_for_status()
+    record_bytes("io.http_get", downloaded=len(response.text.encode("utf-8")))
 
-    df = pd.read_csv(StringIO(response.text))
+    with span("io.parse_csv"):
+        df = pd.read_csv(StringIO(response.text))
 
-    output_path = EXTERNAL / "nyc_311.csv"
-    df.to_csv(output_path, index=False)
+    output_path = write_nyc_311(df, mode=mode)
     print(f"Dataset salvo em: {output_path}")
 
-    return df
\ No newline at end of file
+    return df
+
+
+def nyc_311_path() -> Path:
+    """Root directory of the partitioned NYC 311 dataset."""
+    return EXTERNAL / "nyc_311"
+
+
+def _nyc_311_partition_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the `NYC_311_PARTITIONS` columns (month of creation and borough)."""
+    import pandas as pd
+
+    if "created_date" in df.columns:
+        created = pd.to_datetime(df["created_date"], errors="coerce")
+        month = created.dt.strftime("%Y-%m").fillna("unknown")
+    else:
+        month = "unknown"
+    if "borough" in df.columns:
+        borough = df["borough"].fillna("Unspecified").astype(str)
+    else:
+        borough = "Unspecified"
+    return df.assign(created_month=month, borough=borough)
+
+
+def _nyc_311_schema(root: Path, columns: Iterable[str]):
+    """
+    Union of the stored and the new data columns, all typed as strings.
+
+    Every download infers its own dtypes (sparse columns may come out as
+    int, float or text), so the data columns are stored as strings and the
+    full column list is kept in ``_common_metadata``, which readers reuse
+    instead of trusting whichever file they happen to open first.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = []
+    metadata = root / "_common_metadata"
+    if metadata.exists():
+        names = list(pq.read_schema(metadata).names)
+    names += [name for name in columns if name not in names]
+    return pa.schema([(name, pa.string()) for name in names])
+
+
+def _nyc_311_partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = pa.schema([(name, pa.string()) for name in NYC_311_PARTITIONS])
+    return ds.partitioning(schema, flavor="hive")
+
+
+@instrumented("data.write_nyc_311", size=lambda df, **_: len(df))
+def write_nyc_311(df: pd.DataFrame, mode: str = "append") -> Path:
+    """
+    Write NYC 311 rows as Parquet partitioned by creation month and borough.
+
+    Files land in ``created_month=YYYY-MM/borough=NAME/`` directories and
+    every data column is stored as a string, so downloads whose dtypes were
+    inferred differently can share the dataset. With
+    ``mode="append"`` each call only adds new files (partitions already on
+    disk are never rewritten); ``mode="replace"`` first deletes the
+    partitions present in `df`, so a re-download does not duplicate rows.
+    """
+    if mode not in ("append", "replace"):
+        raise ValueError("mode must be 'append' or 'replace'.")
+    import uuid
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    root = nyc_311_path()
+    if df.empty:
+        return root
+
+    frame = _nyc_311_partition_keys(df)
+    data_columns = [c for c in frame.columns if c not in NYC_311_PARTITIONS]
+    frame = frame.astype({c: "string" for c in data_columns})
+    schema = pa.schema(
+        [(c, pa.string()) for c in data_columns + list(NYC_311_PARTITIONS)]
+    )
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    with span("io.write_parquet", items=table.num_rows):
+        ds.write_dataset(
+            table,
+            root,
+            format="parquet",
+            partitioning=_nyc_311_partitioning(),
+            # Nome único por escrita: um append nunca sobrescreve arquivos antigos.
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior=(
+                "delete_matching" if mode == "replace" else "overwrite_or_ignore"
+            ),
+        )
+        pq.write_metadata(
+            _nyc_311_schema(root, data_columns), root / "_common_metadata"
+        )
+    record_bytes("io.write_parquet", copied=table.nbytes)
+    return root
+
+
+@instrumented("data.read_nyc_311")
+def read_nyc_311(
+    months: Optional[Iterable[str]] = None,
+    boroughs: Optional[Iterable[str]] = None,
+    columns: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """
+    Read the partitioned NYC 311 dataset written by `load_nyc_311`.
+
+    `months` (``"YYYY-MM"``) and `boroughs` select partitions. Only the files
+    in matching directories are opened (partition pruning), and `columns`
+    limits which columns are decoded from them. Data columns come back as
+    strings; columns missing from older files are filled with nulls.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    root = nyc_311_path()
+    if not root.exists():
+        raise FileNotFoundError(f"{root} not found; run load_nyc_311 first.")
+
+    partitioning = _nyc_311_partitioning()
+    schema = None
+    if (root / "_common_metadata").exists():
+        schema = pa.unify_schemas([_nyc_311_schema(root, []), partitioning.schema])
+    dataset = ds.dataset(
+        root, schema=schema, format="parquet", partitioning=partitioning
+    )
+    condition = None
+    for name, values in (("created_month", months), ("borough", boroughs)):
+        if values is not None:
+            clause = ds.field(name).isin(list(values))
+            condition = clause if condition is None else condition & clause
+
+    with span("io.read_parquet"):
+        table = dataset.to_table(columns=columns, filter=condition)
+    return table.to_pandas()
+
+
+def iter_csv_chunks(path: Path, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    """Yield a cached CSV in chunks of at most `chunksize` rows."""
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive.")
+    import pandas as pd
+
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        while True:
+            with span("io.read_csv_chunk"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            yield chunk
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation for the `src` packages.
+
+Functions in `src.stats`, `src.models` and `src.data` are wrapped with
+`instrumented` and their hot inner calls (SciPy/scikit-learn, validation,
+I/O) with `span`. While instrumentation is disabled, the default, both cost a
+single flag check. Enable it with `enable()` or the ``INSTRUMENT=1``
+environment variable, then read the counters with `snapshot()` or export
+them with `export_json` / `export_prometheus`.
+
+`profile()` wraps any block in an ad-hoc cProfile capture.
+"""
+from __future__ import annotations
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+_enabled = os.getenv("INSTRUMENT", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_spans: dict[str, dict[str, float]] = {}
+
+_FIELDS = (
+    "calls",
+    "wall_seconds",
+    "cpu_seconds",
+    "items",
+    "bytes_copied",
+    "bytes_downloaded",
+)
+
+
+def enable() -> None:
+    """Start recording spans."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording spans (already recorded counters are kept)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop every recorded counter."""
+    with _lock:
+        _spans.clear()
+
+
+def _add(name: str, **values: float) -> None:
+    with _lock:
+        counters = _spans.get(name)
+        if counters is None:
+            counters = _spans[name] = dict.fromkeys(_FIELDS, 0)
+        for key, value in values.items():
+            counters[key] += value
+
+
+def record_bytes(name: str, copied: int = 0, downloaded: int = 0) -> None:
+    """Attribute copied or downloaded bytes to the span `name`."""
+    if _enabled:
+        _add(name, bytes_copied=copied, bytes_downloaded=downloaded)
+
+
+class _Span:
+    __slots__ = ("name", "items", "_wall", "_cpu")
+
+    def __init__(self, name: str, items: int):
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        _add(
+            self.name,
+            calls=1,
+            wall_seconds=time.perf_counter() - self._wall,
+            cpu_seconds=time.thread_time() - self._cpu,
+            items=self.items,
+        )
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, items: int = 0):
+    """Context manager timing the enclosed block under `name`."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, items)
+
+
+def instrumented(
+    name: str, size: Optional[Callable[..., int]] = None
+) -> Callable[[Callable], Callable]:
+    """
+    Decorate a function so each call is recorded as a span.
+
+    `size` receives the call arguments and returns the input size stored in
+    the ``items`` counter; it is only evaluated while instrumentation is on.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            items = 0
+            if size is not None:
+                try:
+                    items = int(size(*args, **kwargs))
+                except Exception:  # noqa: BLE001 - size is best effort
+                    items = 0
+            with _Span(name, items):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Return a copy of the counters, keyed by span name."""
+    with _lock:
+        return {name: dict(counters) for name, counters in _spans.items()}
+
+
+def export_json(path: Path) -> Path:
+    """Write the counters to `path` as JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(snapshot(), indent=2, sort_keys=True), encoding="utf-8")
+    return path
+
+
+_PROMETHEUS_HELP = {
+    "calls": "Number of calls per instrumented span.",
+    "wall_seconds": "Wall-clock seconds spent in the span.",
+    "cpu_seconds": "CPU seconds of the calling thread spent in the span.",
+    "items": "Input elements processed by the span.",
+    "bytes_copied": "Bytes copied while converting inputs.",
+    "bytes_downloaded": "Bytes downloaded over the network.",
+}
+
+
+def prometheus_text() -> str:
+    """Render the counters in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+    for field in _FIELDS:
+        metric = f"src_span_{field}_total"
+        lines.append(f"# HELP {metric} {_PROMETHEUS_HELP[field]}")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(data):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{span="{label}"}} {data[name][field]}')
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path: Path) -> Path:
+    """Write the counters to `path` in the Prometheus text format."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(prometheus_text(), encoding="utf-8")
+    return path
+
+
+@contextlib.contextmanager
+def profile(
+    output: Optional[Path] = None, sort: str = "cumulative", limit: Optional[int] = 25
+):
+    """
+    Capture a cProfile of the enclosed block.
+
+    Yields the `cProfile.Profile`. On exit the stats are dumped to `output`
+    (loadable with `pstats`/snakeviz) when given, otherwise the top `limit`
+    entries sorted by `sort` are printed.
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output is not None:
+            output = Path(output)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+
+
+def input_size(value: Any) -> int:
+    """Best-effort element count used by the `size` callbacks."""
+    size = getattr(value, "size", None)
+    if isinstance(size, int):
+        return size
+    return len(value)
@@ -1,16 +1,24 @@
 ﻿# -*- coding: utf-8 -*-
-"""Model evaluation helpers for probabilistic classifiers."""
+"""
+Model evaluation helpers for probabilistic classifiers.
+
+scikit-learn is imported lazily, on the first call that needs its metrics.
+"""
 from __future__ import annotations
 
 from typing import Any
 
 import numpy as np
-from sklearn.metrics import brier_score_loss, roc_auc_score
+
+from src.instrumentation import input_size, instrumented, record_bytes, span
 
 
+@instrumented("evaluate._ensure_1d_proba", size=lambda y_proba: input_size(y_proba))
 def _ensure_1d_proba(y_proba: Any) -> np.ndarray:
     """Normalise probability-like inputs to a 1D positive-class array."""
     arr = np.asarray(y_proba)
+    if arr is not y_proba:
+        record_bytes("evaluate._ensure_1d_proba", copied=arr.nbytes)
     if arr.ndim == 1:
         return arr
     if arr.ndim == 2:
@@ -23,20 +31,202 @@ def _ensure_1d_proba(y_proba: Any) -> np.ndarray:
     )
 
 
-def classification_report_proba(y_true, y_proba, threshold: float = 0.5):
-    """Compute AUC and Brier score for probabilistic classifiers."""
+@instrumented(
+    "evaluate.classification_report_proba",
+    size=lambda y_true, *_, **__: input_size(y_true),
+)
+def classification_report_proba(
+    y_true, y_proba, threshold: float = 0.5, sample_weight=None
+):
+    """
+    Compute AUC and Brier score for probabilistic classifiers.
+
+    `sample_weight` accepts frequency counts, so pre-aggregated
+    ``(label, score, count)`` rows give the same result as the expanded data.
+    """
     if not 0 <= threshold <= 1:
         raise ValueError("threshold must be between 0 and 1.")
 
+    from sklearn.metrics import brier_score_loss, roc_auc_score
+
     proba = _ensure_1d_proba(y_proba)
 
     if len(y_true) != len(proba):
         raise ValueError("y_true and y_proba must have the same number of samples.")
+    if sample_weight is not None and len(sample_weight) != len(proba):
+        raise ValueError("sample_weight must have one entry per sample.")
 
-    auc = roc_auc_score(y_true, proba)
+    with span("sklearn.roc_auc_score"):
+        auc = roc_auc_score(y_true, proba, sample_weight=sample_weight)
+    with span("sklearn.brier_score_loss"):
+        brier = brier_score_loss(y_true, proba, sample_weight=sample_weight)
 
     return {
         "auc": auc,
         "threshold": threshold,
-        "brier": brier_score_loss(y_true, proba),
-    }
\ No newline at end of file
+        "brier": brier,
+    }
+
+
+class CalibrationAccumulator:
+    """
+    Streaming reliability bins for probabilistic binary classifiers.
+
+    Predictions are assigned to bins with `np.searchsorted` and only per-bin
+    sums are kept (weight, sum of probabilities, sum of labels, sum of
+    squared errors), so memory depends on the number of bins, not on the
+    number of predictions. Accumulators fed with different chunks or workers
+    combine with `merge` (they pickle cheaply).
+
+    `bins` is either the number of equal-width bins on [0, 1] or an array of
+    increasing edges starting at 0 and ending at 1.
+    """
+
+    def __init__(self, bins=10):
+        if np.ndim(bins) == 0:
+            if int(bins) < 1:
+                raise ValueError(
+                    "bins must be a positive integer or an array of edges."
+                )
+            edges = np.linspace(0.0, 1.0, int(bins) + 1)
+        else:
+            edges = np.asarray(bins, dtype=float)
+            if (
+                edges.ndim != 1
+                or edges.size < 2
+                or edges[0] != 0.0
+                or edges[-1] != 1.0
+                or np.any(np.diff(edges) <= 0)
+            ):
+                raise ValueError("bin edges must increase from 0 to 1.")
+        self.edges = edges
+        n_bins = edges.size - 1
+        self.weight = np.zeros(n_bins)
+        self.sum_proba = np.zeros(n_bins)
+        self.sum_true = np.zeros(n_bins)
+        self.sum_sq_error = np.zeros(n_bins)
+
+    @instrumented(
+        "evaluate.CalibrationAccumulator.update",
+        size=lambda self, y_true, *_, **__: input_size(y_true),
+    )
+    def update(self, y_true, y_proba, sample_weight=None) -> "CalibrationAccumulator":
+        """Add a chunk of labels (0/1) and positive-class probabilities."""
+        proba = _ensure_1d_proba(y_proba).astype(float, copy=False)
+        y = np.asarray(y_true, dtype=float).ravel()
+        if y.size != proba.size:
+            raise ValueError("y_true and y_proba must have the same number of samples.")
+        if np.any((proba < 0) | (proba > 1)) or np.isnan(proba).any():
+            raise ValueError("y_proba must contain probabilities between 0 and 1.")
+        if np.any((y != 0) & (y != 1)):
+            raise ValueError("y_true must contain binary labels (0 or 1).")
+        if sample_weight is None:
+            w = np.ones_like(proba)
+        else:
+            w = np.asarray(sample_weight, dtype=float).ravel()
+            if w.size != proba.size:
+                raise ValueError("sample_weight must have one entry per sample.")
+
+        n_bins = self.weight.size
+        # Interior edges only: p == 1 falls in the last bin.
+        idx = np.searchsorted(self.edges[1:-1], proba, side="right")
+        self.weight += np.bincount(idx, weights=w, minlength=n_bins)
+        self.sum_proba += np.bincount(idx, weights=w * proba, minlength=n_bins)
+        self.sum_true += np.bincount(idx, weights=w * y, minlength=n_bins)
+        self.sum_sq_error += np.bincount(
+            idx, weights=w * (proba - y) ** 2, minlength=n_bins
+        )
+        return self
+
+    def merge(self, other: "CalibrationAccumulator") -> "CalibrationAccumulator":
+        """Add the bins of `other` (which must use the same edges)."""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("cannot merge accumulators with different bin edges.")
+        self.weight += other.weight
+        self.sum_proba += other.sum_proba
+        self.sum_true += other.sum_true
+        self.sum_sq_error += other.sum_sq_error
+        return self
+
+    @property
+    def total(self) -> float:
+        return float(self.weight.sum())
+
+    def _bin_means(self):
+        if self.total == 0:
+            raise ValueError("no predictions have been accumulated.")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_proba = self.sum_proba / self.weight
+            observed = self.sum_true / self.weight
+        return mean_proba, observed
+
+    def reliability_table(self):
+        """
+        Per-bin reliability table as a DataFrame.
+
+        One row per bin with its edges, count, mean predicted probability,
+        observed positive rate and their gap (NaN for empty bins).
+        """
+        import pandas as pd
+
+        mean_proba, observed = self._bin_means()
+        return pd.DataFrame(
+            {
+                "bin_lower": self.edges[:-1],
+                "bin_upper": self.edges[1:],
+                "count": self.weight,
+                "mean_proba": mean_proba,
+                "observed_rate": observed,
+                "gap": mean_proba - observed,
+            }
+        )
+
+    def expected_calibration_error(self) -> float:
+        """Weighted mean of ``|mean_proba - observed_rate|`` over the bins."""
+        mean_proba, observed = self._bin_means()
+        filled = self.weight > 0
+        gaps = np.abs(mean_proba[filled] - observed[filled])
+        return float(np.dot(self.weight[filled], gaps) / self.total)
+
+    def maximum_calibration_error(self) -> float:
+        """Largest ``|mean_proba - observed_rate|`` among non-empty bins."""
+        mean_proba, observed = self._bin_means()
+        filled = self.weight > 0
+        return float(np.max(np.abs(mean_proba[filled] - observed[filled])))
+
+    def brier_decomposition(self) -> dict:
+        """
+        Murphy decomposition of the Brier score over the bins.
+
+        ``brier`` is exact. ``reliability - resolution + uncertainty`` equals
+        it when every prediction in a bin is identical; ``within_bin`` holds
+        the remainder caused by the spread of probabilities inside bins.
+        """
+        mean_proba, observed = self._bin_means()
+        filled = self.weight > 0
+        n, total = self.weight[filled], self.total
+        base_rate = self.sum_true.sum() / total
+        brier = self.sum_sq_error.sum() / total
+        reliability = np.dot(n, (mean_proba[filled] - observed[filled]) ** 2) / total
+        resolution = np.dot(n, (observed[filled] - base_rate) ** 2) / total
+        uncertainty = base_rate * (1 - base_rate)
+        return {
+            "brier": float(brier),
+            "reliability": float(reliability),
+            "resolution": float(resolution),
+            "uncertainty": float(uncertainty),
+            "within_bin": float(brier - (reliability - resolution + uncertainty)),
+        }
+
+    def report(self) -> dict:
+        """ECE, MCE and the Brier decomposition in a single dictionary."""
+        return {
+            "ece": self.expected_calibration_error(),
+            "mce": self.maximum_calibration_error(),
+            **self.brier_decomposition(),
+        }
+
+
+def calibration_report(y_true, y_proba, bins=10, sample_weight=None) -> dict:
+    """One-shot `CalibrationAccumulator` report for in-memory predictions."""
+    return CalibrationAccumulator(bins).update(y_true, y_proba, sample_weight).report()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Streaming batch scoring: preprocess -> features -> model -> evaluate."""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+import numpy as np
+
+from src.models.evaluate import (
+    CalibrationAccumulator,
+    _ensure_1d_proba,
+    classification_report_proba,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Marca o fim do fluxo de chunks entre os estágios.
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Throughput and latency counters for a single pipeline stage."""
+
+    name: str
+    chunks: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    max_latency: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, rows: int, elapsed: float) -> None:
+        with self._lock:
+            self.chunks += 1
+            self.rows += rows
+            self.seconds += elapsed
+            self.max_latency = max(self.max_latency, elapsed)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.seconds / self.chunks if self.chunks else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "chunks": self.chunks,
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "mean_latency": self.mean_latency,
+            "max_latency": self.max_latency,
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+def _default_features(frame: pd.DataFrame, target: Optional[str]) -> pd.DataFrame:
+    """Use every column except the target as model input."""
+    if target is not None and target in frame.columns:
+        return frame.drop(columns=[target])
+    return frame
+
+
+def _run_source(chunks, outbox, stats, failed, errors) -> None:
+    """Pull chunks from the (usually I/O bound) iterator into the first queue."""
+    iterator = iter(chunks)
+    try:
+        while not failed.is_set():
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            stats.record(len(chunk), time.perf_counter() - start)
+            outbox.put(chunk)
+    except BaseException as exc:  # noqa: BLE001 - repassado ao chamador
+        errors.append(exc)
+        failed.set()
+    finally:
+        outbox.put(_DONE)
+
+
+def _run_stage(fn, inbox, outbox, stats, failed, errors) -> None:
+    """Apply `fn` to every item of `inbox`, draining it after a failure."""
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            break
+        if failed.is_set():
+            continue
+        start = time.perf_counter()
+        try:
+            result, rows = fn(item)
+        except BaseException as exc:  # noqa: BLE001 - repassado ao chamador
+            errors.append(exc)
+            failed.set()
+            continue
+        stats.record(rows, time.perf_counter() - start)
+        outbox.put(result)
+    outbox.put(_DONE)
+
+
+def score_in_batches(
+    chunks: Iterable[pd.DataFrame],
+    model: Any,
+    *,
+    target: Optional[str] = None,
+    preprocess_fn: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    feature_fn: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    output_dir: Optional[Path] = None,
+    queue_size: int = 4,
+    threshold: float = 0.5,
+    calibration_bins: int = 10,
+) -> dict:
+    """
+    Stream `chunks` through preprocess, features, model and evaluation.
+
+    Each stage runs on its own worker thread and talks to the next one through
+    a bounded queue of `queue_size` chunks, so reading the next chunk overlaps
+    with scoring the current one while memory stays bounded. Predictions are
+    written as one Parquet file per chunk in `output_dir` (when given). If
+    `target` is present in the data, the collected probabilities are evaluated
+    with `classification_report_proba` at the end, and, for 0/1 labels,
+    calibration is accumulated chunk by chunk in `calibration_bins`
+    reliability bins.
+
+    Returns:
+        dict: ``files`` written, ``rows`` scored, per-stage ``stages`` counters,
+        ``metrics`` and the ``calibration`` report (both None when there is no
+        target; ``calibration`` is also None for labels other than 0/1).
+    """
+    if queue_size <= 0:
+        raise ValueError("queue_size must be positive.")
+
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    def preprocess(frame):
+        if preprocess_fn is not None:
+            frame = preprocess_fn(frame)
+        return frame, len(frame)
+
+    def features(frame):
+        if feature_fn is not None:
+            X = feature_fn(frame)
+        else:
+            X = _default_features(frame, target)
+        return (frame, X), len(X)
+
+    def predict(item):
+        import pandas as pd
+
+        frame, X = item
+        out = pd.DataFrame(index=X.index)
+        if len(X):
+            out["proba"] = _ensure_1d_proba(model.predict_proba(X))
+        else:
+            out["proba"] = np.empty(0, dtype=float)
+        if target is not None and target in frame.columns:
+            out[target] = frame.loc[X.index, target].to_numpy()
+        return out, len(out)
+
+    stage_fns = [
+        ("preprocess", preprocess),
+        ("features", features),
+        ("predict", predict),
+    ]
+    stats = {"load": StageStats("load")}
+    stats.update({name: StageStats(name) for name, _ in stage_fns})
+    stats["write"] = StageStats("write")
+
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stage_fns) + 1)]
+    failed = threading.Event()
+    errors: list = []
+
+    files = []
+    y_true, y_proba = [], []
+    calibration = CalibrationAccumulator(calibration_bins)
+    total_rows = 0
+
+    with ThreadPoolExecutor(max_workers=len(stage_fns) + 1) as pool:
+        pool.submit(_run_source, chunks, queues[0], stats["load"], failed, errors)
+        for i, (name, fn) in enumerate(stage_fns):
+            pool.submit(
+                _run_stage, fn, queues[i], queues[i + 1], stats[name], failed, errors
+            )
+
+        # O estágio final (escrita + avaliação) roda na thread chamadora.
+        while True:
+            out = queues[-1].get()
+            if out is _DONE:
+                break
+            if failed.is_set():
+                continue
+            start = time.perf_counter()
+            try:
+                if output_dir is not None:
+                    path = output_dir / f"part-{len(files):05d}.parquet"
+                    out.to_parquet(path, index=False)
+                    files.append(path)
+                if target is not None and target in out.columns:
+                    y_true.append(out[target].to_numpy())
+                    y_proba.append(out["proba"].to_numpy())
+                    # Calibração só para rótulos 0/1; outros rótulos a desativam.
+                    if calibration is not None and np.isin(y_true[-1], (0, 1)).all():
+                        calibration.update(y_true[-1], y_proba[-1])
+                    else:
+                        calibration = None
+            except BaseException as exc:  # noqa: BLE001 - repassado ao chamador
+                # Continua drenando a fila para não travar os estágios anteriores.
+                errors.append(exc)
+                failed.set()
+                continue
+            total_rows += len(out)
+            stats["write"].record(len(out), time.perf_counter() - start)
+
+    if errors:
+        raise errors[0]
+
+    metrics = report = None
+    if y_true:
+        metrics = classification_report_proba(
+            np.concatenate(y_true), np.concatenate(y_proba), threshold=threshold
+        )
+    if calibration is not None and calibration.total:
+        report = calibration.report()
+
+    return {
+        "files": files,
+        "rows": total_rows,
+        "stages": [s.as_dict() for s in stats.values()],
+        "metrics": metrics,
+        "calibration": report,
+    }
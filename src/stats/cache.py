@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in memoization for the `src.stats` functions.
+
+Functions decorated with `memoized` look up their result by a content hash
+of the arguments: array-like inputs are hashed over their raw buffers
+together with dtype and shape (with XXH3-128 when the optional ``xxhash``
+package is installed, SHA-256 otherwise), and every other parameter by
+value, after defaults are applied. Results live in a bounded in-memory LRU
+and, optionally, in a directory of pickles shared between processes.
+Repeating a call on an identical snapshot of data then costs one hash of the
+inputs instead of a recomputation.
+
+Keys also cover the source of the module that defines the decorated
+function, the installed NumPy, SciPy and pandas versions, and
+`CACHE_VERSION`. Editing a helper in another module (for example
+`probability._frequency_weights`) is not detected: bump `CACHE_VERSION`
+when such a change alters results, so stale pickles are not served.
+
+The cache is disabled by default, in which case the wrapper costs a single
+flag check. Enable it with `enable()` or the ``STATS_CACHE=1`` environment
+variable (``STATS_CACHE_DIR`` sets the on-disk tier). Read the hit/miss
+counters with `stats()`.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:  # optional: pip install statistics-for-data[cache]
+    xxhash = None
+
+_enabled = os.getenv("STATS_CACHE", "").lower() in ("1", "true", "yes")
+_directory: Optional[Path] = (
+    Path(os.environ["STATS_CACHE_DIR"]) if os.getenv("STATS_CACHE_DIR") else None
+)
+_maxsize = 256
+_lock = threading.Lock()
+_entries: OrderedDict[str, Any] = OrderedDict()
+_COUNTERS = ("hits", "disk_hits", "misses", "evictions", "bypassed", "memory_only")
+_counters = dict.fromkeys(_COUNTERS, 0)
+_UNSET: Any = object()
+
+# Bump to invalidate every stored entry (see the module docstring).
+CACHE_VERSION = 1
+
+
+class Unhashable(TypeError):
+    """Raised when an argument cannot be reduced to a content hash."""
+
+
+def _evict() -> None:
+    """Drop least recently used entries beyond `_maxsize` (caller holds the lock)."""
+    while len(_entries) > _maxsize:
+        _entries.popitem(last=False)
+        _counters["evictions"] += 1
+
+
+def enable(maxsize: Optional[int] = None, directory: Optional[Path] = _UNSET) -> None:
+    """
+    Start memoizing results.
+
+    `maxsize` bounds the number of in-memory entries (least recently used
+    entries are evicted first). With `directory`, results are also pickled
+    there and reused by later processes; ``directory=None`` turns the disk
+    tier off. Settings that are not passed keep their current value, so
+    ``enable()`` does not undo ``STATS_CACHE_DIR`` or an earlier call.
+    """
+    global _enabled, _maxsize, _directory
+    if maxsize is not None and maxsize <= 0:
+        raise ValueError("maxsize must be positive.")
+    with _lock:
+        if maxsize is not None:
+            _maxsize = maxsize
+        if directory is not _UNSET:
+            _directory = Path(directory) if directory is not None else None
+        _evict()
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop memoizing (stored entries are kept until `clear`)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear(disk: bool = False) -> None:
+    """Drop the in-memory entries and counters (and the disk tier with `disk`)."""
+    with _lock:
+        _entries.clear()
+        _counters.update(dict.fromkeys(_COUNTERS, 0))
+        if disk and _directory is not None and _directory.exists():
+            for path in _directory.glob("*.pkl"):
+                path.unlink()
+
+
+def stats() -> dict[str, int]:
+    """Return the hit/miss counters and the current number of entries."""
+    with _lock:
+        return {**_counters, "size": len(_entries), "maxsize": _maxsize}
+
+
+def _update_array(digest, arr: np.ndarray) -> None:
+    digest.update(f"{arr.dtype.str}{arr.shape}".encode())
+    if arr.dtype.hasobject:
+        # Object arrays hold pointers; hash the values themselves.
+        digest.update(pickle.dumps(arr.tolist(), protocol=4))
+    else:
+        digest.update(memoryview(np.ascontiguousarray(arr)).cast("B"))
+
+
+def _update(digest, value: Any) -> None:
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, np.ndarray):
+        _update_array(digest, value)
+    elif isinstance(value, np.generic):
+        _update_array(digest, np.asarray(value))
+    elif type(value).__module__.startswith("pandas"):
+        from pandas.util import hash_pandas_object
+
+        names = getattr(value, "columns", [getattr(value, "name", None)])
+        digest.update(f"{type(value).__name__}{list(names)!r}".encode())
+        _update_array(digest, hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, (list, tuple)):
+        try:
+            arr = np.asarray(value)
+        except ValueError:  # ragged sequences
+            arr = None
+        if arr is not None and arr.dtype.kind in "biufc":
+            # Numeric sequences hash like the equivalent array.
+            _update_array(digest, arr)
+        else:
+            digest.update(f"{type(value).__name__}[{len(value)}]".encode())
+            for item in value:
+                _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict[{len(value)}]".encode())
+        for key in sorted(value, key=repr):
+            _update(digest, key)
+            _update(digest, value[key])
+    else:
+        raise Unhashable(f"cannot hash argument of type {type(value).__name__}.")
+
+
+def content_key(name: str, arguments: dict) -> str:
+    """Hash `arguments` (already bound to parameter names) into a cache key."""
+    digest = xxhash.xxh3_128() if xxhash is not None else hashlib.sha256()
+    digest.update(name.encode())
+    for param in sorted(arguments):
+        digest.update(f"|{param}=".encode())
+        _update(digest, arguments[param])
+    return digest.hexdigest()
+
+
+def _store(key: str, result: Any) -> None:
+    with _lock:
+        _entries[key] = result
+        _entries.move_to_end(key)
+        _evict()
+    if _directory is None:
+        return
+    try:
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except (TypeError, AttributeError, pickle.PicklingError):
+        # Pass a `serializer` to `memoized` to reach the disk tier.
+        with _lock:
+            _counters["memory_only"] += 1
+        return
+    _directory.mkdir(parents=True, exist_ok=True)
+    tmp = _directory / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp.write_bytes(payload)
+    os.replace(tmp, _directory / f"{key}.pkl")
+
+
+def _copy_result(value: Any) -> Any:
+    """Copy the mutable parts of a cached result (arrays, frames, containers)."""
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if type(value).__module__.startswith("pandas") and hasattr(value, "copy"):
+        return value.copy(deep=True)
+    if type(value) in (tuple, list):
+        return type(value)(_copy_result(item) for item in value)
+    if type(value) is dict:
+        return {key: _copy_result(item) for key, item in value.items()}
+    # Named tuples and scalars (e.g. SciPy result objects) are immutable.
+    return value
+
+
+def _lookup(key: str):
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            _counters["hits"] += 1
+            return True, _entries[key]
+    if _directory is not None:
+        path = _directory / f"{key}.pkl"
+        try:
+            result = pickle.loads(path.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+        else:
+            with _lock:
+                _counters["disk_hits"] += 1
+                _entries[key] = result
+                _evict()
+            return True, result
+    with _lock:
+        _counters["misses"] += 1
+    return False, None
+
+
+def _source_hash(fn: Callable) -> str:
+    """Hash the source of the module defining `fn` (or of `fn` itself)."""
+    try:
+        source = inspect.getsource(inspect.getmodule(fn) or fn).encode()
+    except (OSError, TypeError):
+        source = fn.__code__.co_code
+    return hashlib.sha256(source).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def _environment() -> str:
+    """Cache format and library versions that results depend on."""
+    from importlib import metadata
+
+    versions = [f"cache={CACHE_VERSION}"]
+    for package in ("numpy", "scipy", "pandas"):
+        try:
+            versions.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}=none")
+    return ";".join(versions)
+
+
+def memoized(
+    name: str,
+    when: Optional[Callable[[dict], bool]] = None,
+    serializer: Optional[tuple[Callable, Callable]] = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorate a pure function so its results are memoized while enabled.
+
+    `when` receives the bound arguments and returns False for calls that
+    must not be cached (for example, random tests without a seed). Calls
+    with arguments that cannot be hashed run normally and are counted as
+    ``bypassed``. Arrays and DataFrames in the result are copied on every
+    return, so callers may modify them freely.
+
+    `serializer` is an ``(encode, decode)`` pair: entries hold
+    ``encode(result)`` and hits return ``decode(entry)``, which must rebuild
+    an equivalent result (a miss returns the computed result itself). Use
+    it for results that cannot be pickled; without it they are kept in
+    memory only and counted as ``memory_only``.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        versioned = f"{name}@{_source_hash(fn)}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = None
+            try:
+                if when is None or when(bound.arguments):
+                    key = content_key(f"{versioned};{_environment()}", bound.arguments)
+            except Unhashable:
+                pass
+            if key is None:
+                with _lock:
+                    _counters["bypassed"] += 1
+                return fn(*args, **kwargs)
+
+            found, entry = _lookup(key)
+            if serializer is not None:
+                if found:
+                    return serializer[1](entry)
+                result = fn(*args, **kwargs)
+                _store(key, serializer[0](result))
+                return result
+            if not found:
+                entry = fn(*args, **kwargs)
+                _store(key, entry)
+            return _copy_result(entry)
+
+        return wrapper
+
+    return decorator
@@ -5,12 +5,63 @@ Módulo com implementações de testes de hipóteses.
 Este script serve como um wrapper para as funções de testes
 estatísticos da biblioteca SciPy, facilitando seu uso e
 validação cruzada.
+
+O SciPy é importado dentro de cada função, e não no carregamento do módulo,
+para que `import src.stats.hypothesis` continue barato.
 """
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Union
+
 import numpy as np
-from scipy import stats
+
+from src.instrumentation import input_size, instrumented, span
+from src.stats.cache import memoized
+from src.stats.probability import _frequency_weights
 
 
-def two_sample_ttest(a: np.ndarray, b: np.ndarray, equal_var: bool = False):
+def _encode_ttest(result):
+    """
+    Forma serializável do resultado de `two_sample_ttest` para o cache.
+
+    O `TtestResult` do SciPy guarda uma referência a um módulo e não pode ser
+    serializado; guardamos os argumentos do seu construtor e o reconstruímos
+    em `_decode_ttest`, com `df` e `confidence_interval` intactos. Se os
+    atributos privados mudarem, o resultado é guardado como está (só na
+    memória).
+    """
+    try:
+        fields = {
+            "df": result.df,
+            "alternative": result._alternative,
+            "standard_error": result._standard_error,
+            "estimate": result._estimate,
+            "statistic_np": result._statistic_np,
+        }
+    except AttributeError:
+        # Ttest_indResult (caminho com pesos) é uma namedtuple serializável.
+        return None, result
+    return type(result), (result.statistic, result.pvalue, fields)
+
+
+def _decode_ttest(entry):
+    result_type, payload = entry
+    if result_type is None:
+        return payload
+    statistic, pvalue, fields = payload
+    return result_type(statistic, pvalue, **fields)
+
+
+@instrumented(
+    "stats.two_sample_ttest", size=lambda a, b, *_, **__: input_size(a) + input_size(b)
+)
+@memoized("stats.two_sample_ttest", serializer=(_encode_ttest, _decode_ttest))
+def two_sample_ttest(
+    a: np.ndarray,
+    b: np.ndarray,
+    equal_var: bool = False,
+    weights_a: Optional[np.ndarray] = None,
+    weights_b: Optional[np.ndarray] = None,
+):
     """
     Executa um teste t de duas amostras independentes.
 
@@ -19,13 +70,47 @@ def two_sample_ttest(a: np.ndarray, b: np.ndarray, equal_var: bool = False):
         b (np.ndarray): Amostra 2.
         equal_var (bool): Se True, assume variâncias iguais (teste de Student).
                           Se False, não assume (teste de Welch).
+        weights_a, weights_b (np.ndarray, opcional): Frequência de cada valor
+                          de `a`/`b` (dados agregados como pares valor,
+                          contagem). O resultado é exato, igual ao dos dados
+                          expandidos, sem materializar as linhas repetidas.
 
     Returns:
-        tuple: Estatística do teste e p-valor.
+        tuple: Estatística do teste e p-valor. Sem pesos é o `TtestResult` do
+               `scipy.stats.ttest_ind`, com `df` e `confidence_interval()`.
+               Com pesos é o `Ttest_indResult` de
+               `scipy.stats.ttest_ind_from_stats`, que só tem `statistic` e
+               `pvalue`; nos dois casos o resultado desempacota como
+               ``stat, p``.
     """
-    return stats.ttest_ind(a, b, equal_var=equal_var)
+    from scipy import stats
+
+    if weights_a is None and weights_b is None:
+        with span("scipy.ttest_ind"):
+            return stats.ttest_ind(a, b, equal_var=equal_var)
 
+    summaries = [_weighted_summary(a, weights_a), _weighted_summary(b, weights_b)]
+    (mean_a, std_a, n_a), (mean_b, std_b, n_b) = summaries
+    with span("scipy.ttest_ind_from_stats"):
+        return stats.ttest_ind_from_stats(
+            mean_a, std_a, n_a, mean_b, std_b, n_b, equal_var=equal_var
+        )
 
+
+def _weighted_summary(values, weights):
+    """Média, desvio padrão amostral (ddof=1) e n de dados com frequências."""
+    x = np.asarray(values, dtype=float).ravel()
+    w = np.ones_like(x) if weights is None else _frequency_weights(x, weights)
+    n = w.sum()
+    if n < 2:
+        raise ValueError("each sample must have a total frequency of at least 2.")
+    mean = np.dot(w, x) / n
+    var = np.dot(w, (x - mean) ** 2) / (n - 1)
+    return mean, np.sqrt(var), n
+
+
+@instrumented("stats.chi_square_independence", size=lambda table: input_size(table))
+@memoized("stats.chi_square_independence")
 def chi_square_independence(table: np.ndarray):
     """
     Executa o teste Qui-quadrado de independência em uma tabela de contingência.
@@ -37,9 +122,404 @@ def chi_square_independence(table: np.ndarray):
         tuple: Estatística qui-quadrado, p-valor, graus de liberdade,
                frequências esperadas e resíduos padronizados.
     """
-    chi2, p, dof, expected = stats.chi2_contingency(table)
+    from scipy import stats
+
+    with span("scipy.chi2_contingency"):
+        chi2, p, dof, expected = stats.chi2_contingency(table)
 
     # Calcula os resíduos padronizados para identificar as células com maior desvio
     residuals = (table - expected) / np.sqrt(expected)
 
     return chi2, p, dof, expected, residuals
+
+
+# Amostras combinadas compartilhadas com os processos do teste de permutação.
+_PERMUTATION_POOL = {}
+
+# Elementos (permutações x observações) por lote quando `batch_size` é None.
+_PERMUTATION_BATCH_ELEMENTS = 4_000_000
+
+
+def _permutation_statistic(sum_a, sumsq_a, total, total_sq, n_a, n_b, statistic):
+    """Calcula a estatística para vetores de somas (um valor por permutação)."""
+    mean_a = sum_a / n_a
+    mean_b = (total - sum_a) / n_b
+    if statistic == "mean_diff":
+        return mean_a - mean_b
+    var_a = (sumsq_a - n_a * mean_a**2) / (n_a - 1)
+    var_b = ((total_sq - sumsq_a) - n_b * mean_b**2) / (n_b - 1)
+    return (mean_a - mean_b) / np.sqrt(var_a / n_a + var_b / n_b)
+
+
+def _init_permutation_worker(pooled: np.ndarray, counts: Optional[np.ndarray]):
+    _PERMUTATION_POOL["pooled"] = pooled
+    _PERMUTATION_POOL["counts"] = counts
+
+
+def _permutation_batch(seed, size, n_a, statistic, pooled=None, counts=None):
+    """
+    Estatísticas de `size` permutações aleatórias.
+
+    Sem `counts`, cada permutação é uma linha de uma matriz de índices. Com
+    frequências, o número de cópias de cada valor que cai no grupo A segue
+    uma hipergeométrica multivariada, sorteada para o lote inteiro de uma vez.
+    """
+    if pooled is None:
+        pooled = _PERMUTATION_POOL["pooled"]
+        counts = _PERMUTATION_POOL["counts"]
+    rng = np.random.default_rng(seed)
+    if counts is None:
+        n = pooled.size
+        # Cada linha é uma permutação; as `n_a` primeiras colunas formam o grupo A.
+        index = rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+        group_a = pooled[index[:, :n_a]]
+        sum_a = group_a.sum(axis=1)
+        sumsq_a = (group_a**2).sum(axis=1) if statistic == "t" else None
+        total, total_sq = pooled.sum(), (pooled**2).sum()
+    else:
+        n = int(counts.sum())
+        draws = rng.multivariate_hypergeometric(counts, n_a, size=size)
+        sum_a = draws @ pooled
+        sumsq_a = draws @ pooled**2 if statistic == "t" else None
+        total, total_sq = counts @ pooled, counts @ pooled**2
+    return _permutation_statistic(
+        sum_a, sumsq_a, total, total_sq, n_a, n - n_a, statistic
+    )
+
+
+@instrumented(
+    "stats.permutation_test",
+    size=lambda a, b, *_, **__: input_size(a) + input_size(b),
+)
+# Sem semente o resultado é aleatório e não pode ser reaproveitado.
+@memoized("stats.permutation_test", when=lambda args: args["seed"] is not None)
+def permutation_test(
+    a: np.ndarray,
+    b: np.ndarray,
+    n_permutations: int = 10_000,
+    statistic: str = "mean_diff",
+    alternative: str = "two-sided",
+    batch_size: Optional[int] = None,
+    n_jobs: int = 1,
+    seed: Optional[int] = None,
+    weights_a: Optional[np.ndarray] = None,
+    weights_b: Optional[np.ndarray] = None,
+):
+    """
+    Executa um teste de permutação para duas amostras independentes.
+
+    As permutações são geradas em lotes, como matrizes de índices
+    (permutações x observações), e a estatística de todas as permutações do
+    lote é calculada de uma vez com somas vetorizadas. O tamanho do lote
+    limita a memória usada; os lotes podem ser distribuídos entre processos.
+    Cada lote recebe uma semente derivada de `seed` via `SeedSequence`, então
+    o resultado é o mesmo para qualquer `n_jobs`.
+
+    Args:
+        a (np.ndarray): Amostra 1.
+        b (np.ndarray): Amostra 2.
+        n_permutations (int): Número de permutações aleatórias.
+        statistic (str): "mean_diff" (média de a - média de b) ou "t"
+                         (estatística t de Welch).
+        alternative (str): "two-sided", "greater" ou "less".
+        batch_size (int, opcional): Permutações por lote. Por padrão, cerca
+                                    de 4 milhões de elementos por lote.
+        n_jobs (int): Número de processos. 1 executa no processo atual.
+        seed (int, opcional): Semente para reprodutibilidade.
+        weights_a, weights_b (np.ndarray, opcional): Contagens inteiras de
+                          cada valor (dados agregados). As permutações são
+                          sorteadas sobre as contagens, sem expandir linhas.
+
+    Returns:
+        tuple: Estatística observada e p-valor, com a correção
+               (acertos + 1) / (permutações + 1). Ambos são NaN quando a
+               estatística observada não é finita (por exemplo, NaN nas
+               amostras).
+    """
+    if statistic not in ("mean_diff", "t"):
+        raise ValueError("statistic must be 'mean_diff' or 't'.")
+    if alternative not in ("two-sided", "greater", "less"):
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'.")
+    if n_permutations <= 0:
+        raise ValueError("n_permutations must be positive.")
+
+    a = np.asarray(a, dtype=float).ravel()
+    b = np.asarray(b, dtype=float).ravel()
+    pooled = np.concatenate([a, b])
+    counts = None
+    if weights_a is not None or weights_b is not None:
+        w_a = np.ones_like(a) if weights_a is None else _frequency_weights(a, weights_a)
+        w_b = np.ones_like(b) if weights_b is None else _frequency_weights(b, weights_b)
+        counts = np.concatenate([w_a, w_b])
+        if np.any(counts != np.round(counts)):
+            raise ValueError("weights must be integer frequency counts.")
+        counts = counts.astype(np.int64)
+        n_a, n_b = int(w_a.sum()), int(w_b.sum())
+    else:
+        w_a = np.ones_like(a)
+        n_a, n_b = a.size, b.size
+
+    # As estatísticas não mudam com um deslocamento dos dados; centralizar na
+    # média combinada evita o cancelamento em `sumsq - n * mean**2` quando os
+    # valores têm um offset grande (ex.: receita em torno de 1e8).
+    if n_a + n_b > 0:
+        weights = np.ones_like(pooled) if counts is None else counts
+        pooled = pooled - np.dot(weights, pooled) / weights.sum()
+    a = pooled[: a.size]
+    sum_a, sumsq_a = w_a @ a, w_a @ a**2
+    if counts is None:
+        total, total_sq = pooled.sum(), (pooled**2).sum()
+    else:
+        total, total_sq = counts @ pooled, counts @ pooled**2
+
+    min_size = 2 if statistic == "t" else 1
+    if n_a < min_size or n_b < min_size:
+        raise ValueError(f"each sample must have at least {min_size} observations.")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = float(
+            _permutation_statistic(sum_a, sumsq_a, total, total_sq, n_a, n_b, statistic)
+        )
+    if not np.isfinite(observed):
+        # NaN nas amostras, ou estatística t indefinida (variância nula nos
+        # dois grupos): como em `two_sample_ttest`, não há p-valor.
+        return observed, float("nan")
+
+    if batch_size is None:
+        batch_size = max(1, _PERMUTATION_BATCH_ELEMENTS // pooled.size)
+    batch_size = min(batch_size, n_permutations)
+    sizes = [batch_size] * (n_permutations // batch_size)
+    if n_permutations % batch_size:
+        sizes.append(n_permutations % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    # Tolerância relativa para empates numéricos com a estatística observada.
+    tol = 1e-12 * max(1.0, abs(observed))
+
+    # Permutações com t indefinido (0 / 0) contam como não extremas.
+    def hits(null: np.ndarray) -> int:
+        if alternative == "greater":
+            return int(np.count_nonzero(null >= observed - tol))
+        if alternative == "less":
+            return int(np.count_nonzero(null <= observed + tol))
+        return int(np.count_nonzero(np.abs(null) >= abs(observed) - tol))
+
+    count = 0
+    if n_jobs == 1:
+        for child, size in zip(seeds, sizes):
+            count += hits(
+                _permutation_batch(child, size, n_a, statistic, pooled, counts)
+            )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_permutation_worker,
+            initargs=(pooled, counts),
+        ) as executor:
+            futures = [
+                executor.submit(_permutation_batch, child, size, n_a, statistic)
+                for child, size in zip(seeds, sizes)
+            ]
+            for future in futures:
+                count += hits(future.result())
+
+    pvalue = (count + 1) / (n_permutations + 1)
+    return observed, pvalue
+
+
+def _grouped_codes(frame, value, group, by, weight=None):
+    """
+    Codifica testes e grupos como inteiros para reduções com `np.bincount`.
+
+    Returns:
+        tuple: valores, frequências (1 quando `weight` é None), código do
+               teste por linha, código da célula (teste x grupo) por linha,
+               teste de cada célula e as chaves dos testes (DataFrame com as
+               colunas de `by`).
+    """
+    import pandas as pd
+
+    if by is None:
+        by = []
+    elif isinstance(by, str):
+        by = [by]
+    else:
+        by = list(by)
+
+    columns = by + [group, value] + ([weight] if weight is not None else [])
+    data = frame[columns].dropna()
+    x = data[value].to_numpy(dtype=float)
+    if weight is None:
+        w = np.ones_like(x)
+    else:
+        w = _frequency_weights(x, data[weight].to_numpy(dtype=float))
+    if by:
+        by_test = data.groupby(by, sort=True, observed=True)
+        tests = by_test.ngroup().to_numpy()
+        keys = by_test.size().index.to_frame(index=False)
+    else:
+        tests = np.zeros(len(data), dtype=np.intp)
+        keys = pd.DataFrame(index=range(1 if len(data) else 0))
+    cells = data.groupby(by + [group], sort=True, observed=True).ngroup().to_numpy()
+
+    n_cells = int(cells.max()) + 1 if cells.size else 0
+    cell_test = np.zeros(n_cells, dtype=np.intp)
+    cell_test[cells] = tests
+    return x, w, tests, cells, cell_test, keys
+
+
+@instrumented("stats.anova_by", size=lambda frame, *_, **__: len(frame))
+@memoized("stats.anova_by")
+def anova_by(
+    frame,
+    value: str,
+    group: str,
+    by: Union[str, Sequence[str], None],
+    weight: Optional[str] = None,
+):
+    """
+    Executa uma ANOVA de um fator para cada combinação das colunas `by`.
+
+    Todas as somas de quadrados (entre e dentro dos grupos) são calculadas de
+    uma vez com `np.bincount` sobre códigos inteiros de teste e de grupo, sem
+    dividir o DataFrame em um array por grupo.
+
+    Args:
+        frame (pd.DataFrame): Dados em formato longo.
+        value (str): Coluna com a variável resposta.
+        group (str): Coluna com o fator (os grupos comparados).
+        by (str | list[str] | None): Colunas que identificam cada teste.
+                                     None executa um único teste.
+        weight (str, opcional): Coluna com a frequência de cada linha, para
+                                dados já agregados em (valor, contagem).
+
+    Returns:
+        pd.DataFrame: Uma linha por teste com as colunas de `by`, n_groups,
+                      n_obs, ss_between, ss_within, df_between, df_within,
+                      f_stat, pvalue e eta_squared.
+    """
+    from scipy import stats
+
+    x, w, tests, cells, cell_test, keys = _grouped_codes(
+        frame, value, group, by, weight
+    )
+    n_tests = len(keys)
+
+    n_obs = np.bincount(tests, weights=w, minlength=n_tests)
+    # Centraliza pela média do teste para evitar cancelamento numérico.
+    test_mean = np.bincount(tests, weights=w * x, minlength=n_tests) / np.maximum(
+        n_obs, 1
+    )
+    centered = x - test_mean[tests]
+
+    cell_n = np.bincount(cells, weights=w, minlength=cell_test.size)
+    cell_sum = np.bincount(cells, weights=w * centered, minlength=cell_test.size)
+    ss_total = np.bincount(tests, weights=w * centered**2, minlength=n_tests)
+    ss_between = np.bincount(
+        cell_test, weights=cell_sum**2 / np.maximum(cell_n, 1), minlength=n_tests
+    )
+    ss_within = np.maximum(ss_total - ss_between, 0.0)
+
+    n_groups = np.bincount(cell_test, weights=cell_n > 0, minlength=n_tests)
+    n_groups = n_groups.astype(np.int64)
+    df_between = n_groups - 1
+    df_within = n_obs - n_groups
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_stat = (ss_between / df_between) / (ss_within / df_within)
+        eta_squared = ss_between / ss_total
+    valid = (df_between > 0) & (df_within > 0)
+    f_stat = np.where(valid, f_stat, np.nan)
+    pvalue = np.where(valid, stats.f.sf(f_stat, df_between, df_within), np.nan)
+
+    result = keys.copy()
+    result["n_groups"] = n_groups
+    result["n_obs"] = n_obs if weight is not None else n_obs.astype(np.int64)
+    result["ss_between"] = ss_between
+    result["ss_within"] = ss_within
+    result["df_between"] = df_between
+    result["df_within"] = df_within
+    result["f_stat"] = f_stat
+    result["pvalue"] = pvalue
+    result["eta_squared"] = eta_squared
+    return result
+
+
+@instrumented("stats.kruskal_by", size=lambda frame, *_, **__: len(frame))
+@memoized("stats.kruskal_by")
+def kruskal_by(
+    frame,
+    value: str,
+    group: str,
+    by: Union[str, Sequence[str], None],
+    weight: Optional[str] = None,
+):
+    """
+    Executa o teste de Kruskal-Wallis para cada combinação das colunas `by`.
+
+    Os postos (com média para empates) são calculados dentro de cada teste
+    com uma única ordenação por (teste, valor); somas de postos e correções
+    de empate são reduções por segmento com `np.bincount`.
+
+    Args:
+        frame (pd.DataFrame): Dados em formato longo.
+        value (str): Coluna com a variável resposta.
+        group (str): Coluna com o fator (os grupos comparados).
+        by (str | list[str] | None): Colunas que identificam cada teste.
+                                     None executa um único teste.
+        weight (str, opcional): Coluna com a frequência de cada linha. Uma
+                                linha com contagem c equivale a c empates.
+
+    Returns:
+        pd.DataFrame: Uma linha por teste com as colunas de `by`, n_groups,
+                      n_obs, h_stat, df e pvalue.
+    """
+    from scipy import stats
+
+    x, w, tests, cells, cell_test, keys = _grouped_codes(
+        frame, value, group, by, weight
+    )
+    n_tests = len(keys)
+    n_obs = np.bincount(tests, weights=w, minlength=n_tests)
+
+    order = np.lexsort((x, tests))
+    xs, ts = x[order], tests[order]
+    size = xs.size
+    # Início de cada sequência de empates (mesmo teste e mesmo valor).
+    new_run = np.ones(size, dtype=bool)
+    new_run[1:] = (ts[1:] != ts[:-1]) | (xs[1:] != xs[:-1])
+    run_id = np.cumsum(new_run) - 1
+    run_test = ts[new_run]
+    # Tamanho de cada sequência, em frequência (número de observações).
+    run_len = np.bincount(run_id, weights=w[order])
+    run_end = np.cumsum(run_len)
+
+    test_start = np.cumsum(n_obs) - n_obs
+    # Posto médio da sequência: posição no teste + (tamanho da sequência + 1) / 2.
+    run_rank = run_end - run_len - test_start[run_test] + (run_len + 1) / 2
+    ranks = np.empty(size)
+    ranks[order] = run_rank[run_id]
+
+    cell_n = np.bincount(cells, weights=w, minlength=cell_test.size)
+    rank_sum = np.bincount(cells, weights=w * ranks, minlength=cell_test.size)
+    n = n_obs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_stat = 12.0 / (n * (n + 1)) * np.bincount(
+            cell_test, weights=rank_sum**2 / np.maximum(cell_n, 1), minlength=n_tests
+        ) - 3 * (n + 1)
+        ties = np.bincount(run_test, weights=run_len**3 - run_len, minlength=n_tests)
+        h_stat = h_stat / (1 - ties / (n**3 - n))
+
+    n_groups = np.bincount(cell_test, weights=cell_n > 0, minlength=n_tests)
+    n_groups = n_groups.astype(np.int64)
+    df = n_groups - 1
+    valid = (df > 0) & np.isfinite(h_stat)
+    h_stat = np.where(valid, h_stat, np.nan)
+    pvalue = np.where(valid, stats.chi2.sf(h_stat, np.maximum(df, 1)), np.nan)
+
+    result = keys.copy()
+    result["n_groups"] = n_groups
+    result["n_obs"] = n_obs if weight is not None else n_obs.astype(np.int64)
+    result["h_stat"] = h_stat
+    result["df"] = df
+    result["pvalue"] = pvalue
+    return result
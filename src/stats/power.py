@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Análise de poder e cálculo de tamanho de amostra.
+
+Cobre os testes já encapsulados em `src.stats.hypothesis`: o teste t de duas
+amostras independentes e o teste qui-quadrado. Todas as funções aceitam
+arrays e aplicam broadcasting do NumPy, de modo que uma grade inteira de
+combinações (tamanho de efeito x alpha x poder x razão de alocação) é
+avaliada de uma vez. O tamanho de amostra é obtido por bisseção vetorizada:
+cada iteração avalia o poder de todos os pontos da grade em uma só chamada
+ao SciPy.
+
+Como em `hypothesis`, o SciPy é importado dentro das funções.
+"""
+from typing import Callable
+
+import numpy as np
+
+from src.instrumentation import instrumented
+
+_ALTERNATIVES = ("two-sided", "greater", "less")
+
+
+def _check_alternative(alternative: str) -> None:
+    if alternative not in _ALTERNATIVES:
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'.")
+
+
+def _check_open_unit(name: str, value) -> np.ndarray:
+    value = np.asarray(value, dtype=float)
+    if np.any((value <= 0) | (value >= 1)):
+        raise ValueError(f"{name} must be between 0 and 1 (exclusive).")
+    return value
+
+
+def _scalar_or_array(result: np.ndarray):
+    return float(result) if result.ndim == 0 else result
+
+
+def _ttest_power(effect_size, n1, alpha, ratio, alternative):
+    from scipy import stats
+
+    n2 = n1 * ratio
+    df = n1 + n2 - 2
+    nc = effect_size * np.sqrt(n1 * n2 / (n1 + n2))
+    if alternative == "two-sided":
+        crit = stats.t.isf(alpha / 2, df)
+        return stats.nct.sf(crit, df, nc) + stats.nct.cdf(-crit, df, nc)
+    crit = stats.t.isf(alpha, df)
+    if alternative == "greater":
+        return stats.nct.sf(crit, df, nc)
+    return stats.nct.cdf(-crit, df, nc)
+
+
+def _chi2_power(effect_size, n, df, alpha):
+    from scipy import stats
+
+    crit = stats.chi2.isf(alpha, df)
+    return stats.ncx2.sf(crit, df, n * effect_size**2)
+
+
+@instrumented("stats.ttest_power")
+def ttest_power(
+    effect_size,
+    n1,
+    alpha=0.05,
+    ratio=1.0,
+    alternative: str = "two-sided",
+):
+    """
+    Calcula o poder do teste t de duas amostras independentes.
+
+    Args:
+        effect_size (float | np.ndarray): d de Cohen (diferença de médias
+                                          dividida pelo desvio padrão).
+        n1 (float | np.ndarray): Tamanho da amostra 1.
+        alpha (float | np.ndarray): Nível de significância.
+        ratio (float | np.ndarray): Razão de alocação n2 / n1.
+        alternative (str): "two-sided", "greater" ou "less".
+
+    Returns:
+        float | np.ndarray: Poder para cada combinação (broadcasting).
+    """
+    _check_alternative(alternative)
+    alpha = _check_open_unit("alpha", alpha)
+    n1, ratio = np.asarray(n1, dtype=float), np.asarray(ratio, dtype=float)
+    if np.any(ratio <= 0):
+        raise ValueError("ratio must be positive.")
+    if np.any(n1 * (1 + ratio) <= 2):
+        raise ValueError("n1 * (1 + ratio) must be greater than 2.")
+    power = _ttest_power(
+        np.asarray(effect_size, dtype=float), n1, alpha, ratio, alternative
+    )
+    return _scalar_or_array(np.asarray(power))
+
+
+@instrumented("stats.chi2_power")
+def chi2_power(effect_size, n, df, alpha=0.05):
+    """
+    Calcula o poder do teste qui-quadrado (independência ou aderência).
+
+    Args:
+        effect_size (float | np.ndarray): w de Cohen.
+        n (float | np.ndarray): Número total de observações.
+        df (int | np.ndarray): Graus de liberdade do teste; para uma tabela
+                               r x c, (r - 1) * (c - 1).
+        alpha (float | np.ndarray): Nível de significância.
+
+    Returns:
+        float | np.ndarray: Poder para cada combinação (broadcasting).
+    """
+    alpha = _check_open_unit("alpha", alpha)
+    n, df = np.asarray(n, dtype=float), np.asarray(df, dtype=float)
+    if np.any(n <= 0) or np.any(df <= 0):
+        raise ValueError("n and df must be positive.")
+    power = _chi2_power(np.asarray(effect_size, dtype=float), n, df, alpha)
+    return _scalar_or_array(np.asarray(power))
+
+
+def _solve_increasing(
+    power_fn: Callable[[np.ndarray], np.ndarray],
+    target: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    valid: np.ndarray,
+    rtol: float = 1e-6,
+    max_iter: int = 200,
+) -> np.ndarray:
+    """
+    Bisseção vetorizada do menor n com `power_fn(n) >= target`.
+
+    `power_fn` deve ser crescente em n. O limite superior é dobrado até
+    cobrir o alvo; pontos fora de `valid` (por exemplo, efeito zero) ou que
+    não o alcançam resultam em NaN.
+    """
+    lo, hi, valid = np.broadcast_arrays(lo, hi, valid, target)[:3]
+    lo, hi = lo.astype(float), hi.astype(float)
+
+    # Expande o intervalo onde o poder em `hi` ainda não alcança o alvo.
+    short = valid & ~(power_fn(hi) >= target)
+    for _ in range(40):
+        if not short.any():
+            break
+        lo = np.where(short, hi, lo)
+        hi = np.where(short, hi * 2, hi)
+        short &= ~(power_fn(hi) >= target)
+    unsolved = short | ~valid
+
+    for _ in range(max_iter):
+        if np.all(hi - lo <= rtol * hi):
+            break
+        mid = (lo + hi) / 2
+        enough = power_fn(mid) >= target
+        hi = np.where(enough, mid, hi)
+        lo = np.where(enough, lo, mid)
+
+    return np.where(unsolved, np.nan, hi)
+
+
+@instrumented("stats.ttest_sample_size")
+def ttest_sample_size(
+    effect_size,
+    alpha=0.05,
+    power=0.8,
+    ratio=1.0,
+    alternative: str = "two-sided",
+):
+    """
+    Resolve o tamanho da amostra 1 do teste t para atingir o poder desejado.
+
+    Todos os argumentos numéricos aceitam arrays; o resultado tem o formato
+    do broadcasting entre eles. A amostra 2 tem ``ceil(ratio * n1)``
+    observações.
+
+    Args:
+        effect_size (float | np.ndarray): d de Cohen (diferente de zero).
+        alpha (float | np.ndarray): Nível de significância.
+        power (float | np.ndarray): Poder desejado.
+        ratio (float | np.ndarray): Razão de alocação n2 / n1.
+        alternative (str): "two-sided", "greater" ou "less".
+
+    Returns:
+        float | np.ndarray: n1 arredondado para cima; NaN quando o poder não
+                            é atingível (efeito nulo ou no sentido oposto à
+                            hipótese alternativa).
+    """
+    from scipy import stats
+
+    _check_alternative(alternative)
+    alpha = _check_open_unit("alpha", alpha)
+    power = _check_open_unit("power", power)
+    ratio = np.asarray(ratio, dtype=float)
+    if np.any(ratio <= 0):
+        raise ValueError("ratio must be positive.")
+    effect_size = np.asarray(effect_size, dtype=float)
+    effect_size, alpha, power, ratio = np.broadcast_arrays(
+        effect_size, alpha, power, ratio
+    )
+
+    # Aproximação normal como ponto de partida do intervalo.
+    tail = alpha / 2 if alternative == "two-sided" else alpha
+    z = stats.norm.isf(tail) + stats.norm.ppf(power)
+    with np.errstate(divide="ignore"):
+        guess = (1 + 1 / ratio) * (z / np.abs(effect_size)) ** 2
+    lo = 2 / (1 + ratio) + 1e-9
+    hi = np.maximum(np.where(np.isfinite(guess), 2 * guess, 1e6), 4.0)
+
+    def power_fn(n1):
+        return _ttest_power(effect_size, n1, alpha, ratio, alternative)
+
+    if alternative == "greater":
+        valid = effect_size > 0
+    elif alternative == "less":
+        valid = effect_size < 0
+    else:
+        valid = effect_size != 0
+    n1 = _solve_increasing(power_fn, power, lo, hi, valid)
+    return _scalar_or_array(np.ceil(n1))
+
+
+@instrumented("stats.chi2_sample_size")
+def chi2_sample_size(effect_size, df, alpha=0.05, power=0.8):
+    """
+    Resolve o número total de observações do teste qui-quadrado.
+
+    Args:
+        effect_size (float | np.ndarray): w de Cohen (positivo).
+        df (int | np.ndarray): Graus de liberdade do teste.
+        alpha (float | np.ndarray): Nível de significância.
+        power (float | np.ndarray): Poder desejado.
+
+    Returns:
+        float | np.ndarray: n arredondado para cima (NaN para efeito nulo).
+    """
+    from scipy import stats
+
+    alpha = _check_open_unit("alpha", alpha)
+    power = _check_open_unit("power", power)
+    df = np.asarray(df, dtype=float)
+    if np.any(df <= 0):
+        raise ValueError("df must be positive.")
+    effect_size, df, alpha, power = np.broadcast_arrays(
+        np.asarray(effect_size, dtype=float), df, alpha, power
+    )
+
+    # Parâmetro de não centralidade necessário, aproximado pela normal.
+    z = stats.norm.isf(alpha) + stats.norm.ppf(power)
+    with np.errstate(divide="ignore"):
+        guess = (z + np.sqrt(df)) ** 2 / effect_size**2
+    hi = np.maximum(np.where(np.isfinite(guess), 2 * guess, 1e6), 2.0)
+
+    def power_fn(n):
+        return _chi2_power(effect_size, n, df, alpha)
+
+    n = _solve_increasing(power_fn, power, 1e-9, hi, effect_size != 0)
+    return _scalar_or_array(np.ceil(n))
@@ -1,11 +1,19 @@
 ﻿# -*- coding: utf-8 -*-
-"""Probability utilities used across the project."""
+"""
+Probability utilities used across the project.
+
+SciPy is imported inside the functions that need it, so importing this
+module only pays for NumPy.
+"""
 from __future__ import annotations
 
-from typing import Iterable
+import functools
+from dataclasses import dataclass
+from typing import Iterable, Optional
 
 import numpy as np
-from scipy import stats
+
+from src.instrumentation import input_size, instrumented, record_bytes, span
 
 
 def bernoulli_pmf(k: int, p: float) -> float:
@@ -17,16 +25,392 @@ def bernoulli_pmf(k: int, p: float) -> float:
     return p if k == 1 else 1 - p
 
 
+@instrumented("stats.normal_cdf")
 def normal_cdf(x: float, mean: float = 0.0, std: float = 1.0) -> float:
     """Evaluate the Normal CDF in `x` with the given location and scale."""
     if std <= 0:
         raise ValueError("std must be positive.")
-    return float(stats.norm.cdf(x, loc=mean, scale=std))
+    from scipy import stats
+
+    with span("scipy.norm.cdf"):
+        return float(stats.norm.cdf(x, loc=mean, scale=std))
+
+
+def _check_probability(p) -> np.ndarray:
+    p = np.asarray(p, dtype=float)
+    if np.any((p < 0) | (p > 1)):
+        raise ValueError("p must be between 0 and 1.")
+    return p
+
+
+def _check_trials(n) -> np.ndarray:
+    n = np.asarray(n, dtype=float)
+    if np.any((n < 0) | (n != np.floor(n))):
+        raise ValueError("n must be a non-negative integer.")
+    return n
+
+
+def _check_rate(mu) -> np.ndarray:
+    mu = np.asarray(mu, dtype=float)
+    if np.any(mu < 0):
+        raise ValueError("mu must be non-negative.")
+    return mu
+
+
+def _scalar_or_array(result: np.ndarray):
+    return float(result) if result.ndim == 0 else result
+
+
+def binomial_logpmf(k, n, p):
+    """
+    Log of the Binomial(n, p) PMF, broadcast over `k`, `n` and `p`.
+
+    Computed with log-gamma terms, so it stays finite for very large `n`
+    where the PMF itself underflows. Values of `k` outside the support
+    (negative, non-integer or above `n`) give ``-inf``.
+    """
+    from scipy import special
+
+    k = np.asarray(k, dtype=float)
+    n = _check_trials(n)
+    p = _check_probability(p)
+    with np.errstate(invalid="ignore"):
+        out = (
+            special.gammaln(n + 1)
+            - special.gammaln(k + 1)
+            - special.gammaln(n - k + 1)
+            + special.xlogy(k, p)
+            + special.xlog1py(n - k, -p)
+        )
+    out = np.where((k < 0) | (k > n) | (k != np.floor(k)), -np.inf, out)
+    return _scalar_or_array(out)
+
+
+def binomial_pmf(k, n, p):
+    """Binomial(n, p) PMF, broadcast over `k`, `n` and `p`."""
+    return _scalar_or_array(np.exp(binomial_logpmf(k, n, p)))
+
+
+def binomial_cdf(k, n, p):
+    """P(X <= k) for X ~ Binomial(n, p), via the regularized incomplete beta."""
+    from scipy import special
+
+    n = _check_trials(n)
+    p = _check_probability(p)
+    k = np.floor(np.asarray(k, dtype=float))
+    idx = np.clip(np.nan_to_num(k), 0, n).astype(np.int64)
+    out = special.bdtr(idx, n.astype(np.int64), p)
+    out = np.where(k < 0, 0.0, np.where(k >= n, 1.0, out))
+    out = np.where(np.isnan(k), np.nan, out)
+    return _scalar_or_array(out)
+
+
+def binomial_sf(k, n, p):
+    """
+    Upper tail P(X > k) for X ~ Binomial(n, p).
+
+    Evaluated directly rather than as ``1 - cdf``, so small tail
+    probabilities keep their precision.
+    """
+    from scipy import special
+
+    n = _check_trials(n)
+    p = _check_probability(p)
+    k = np.floor(np.asarray(k, dtype=float))
+    idx = np.clip(np.nan_to_num(k), 0, n).astype(np.int64)
+    out = special.bdtrc(idx, n.astype(np.int64), p)
+    out = np.where(k < 0, 1.0, np.where(k >= n, 0.0, out))
+    out = np.where(np.isnan(k), np.nan, out)
+    return _scalar_or_array(out)
+
+
+def poisson_logpmf(k, mu):
+    """Log of the Poisson(mu) PMF, broadcast over `k` and `mu`."""
+    from scipy import special
+
+    k = np.asarray(k, dtype=float)
+    mu = _check_rate(mu)
+    out = special.xlogy(k, mu) - mu - special.gammaln(k + 1)
+    out = np.where((k < 0) | (k != np.floor(k)), -np.inf, out)
+    return _scalar_or_array(out)
+
+
+def poisson_pmf(k, mu):
+    """Poisson(mu) PMF, broadcast over `k` and `mu`."""
+    return _scalar_or_array(np.exp(poisson_logpmf(k, mu)))
+
+
+def poisson_cdf(k, mu):
+    """P(X <= k) for X ~ Poisson(mu)."""
+    from scipy import special
+
+    mu = _check_rate(mu)
+    k = np.floor(np.asarray(k, dtype=float))
+    out = np.where(k < 0, 0.0, special.pdtr(np.maximum(k, 0), mu))
+    return _scalar_or_array(out)
+
+
+def poisson_sf(k, mu):
+    """Upper tail P(X > k) for X ~ Poisson(mu), evaluated directly."""
+    from scipy import special
+
+    mu = _check_rate(mu)
+    k = np.floor(np.asarray(k, dtype=float))
+    out = np.where(k < 0, 1.0, special.pdtrc(np.maximum(k, 0), mu))
+    return _scalar_or_array(out)
+
 
+@dataclass(frozen=True)
+class DiscreteTable:
+    """
+    Precomputed PMF, CDF and upper tail over the support ``0..k_max``.
 
-def sample_mean(values: Iterable[float]) -> float:
-    """Return the arithmetic mean ignoring NaN values."""
+    Lookups are plain array indexing. Below the support the PMF and CDF are 0.
+    Above `k_max` the PMF is 0, the CDF is 1 and the tail is 0. For Poisson
+    tables `k_max` is chosen so that the mass beyond it is negligible
+    (below 1e-15).
+    """
+
+    pmf_values: np.ndarray
+    cdf_values: np.ndarray
+    sf_values: np.ndarray
+
+    @property
+    def k_max(self) -> int:
+        return self.pmf_values.size - 1
+
+    def _lookup(self, table, k, below, above, integer_only=False):
+        # Like binomial_cdf, the CDF and tail floor k; the PMF is 0 off the
+        # integers, as in binomial_pmf.
+        k = np.asarray(k, dtype=float)
+        whole = np.floor(k)
+        idx = np.clip(np.nan_to_num(whole), 0, self.k_max).astype(np.intp)
+        out = np.where(
+            whole < 0, below, np.where(whole > self.k_max, above, table[idx])
+        )
+        out = np.where(np.isnan(k), np.nan, out)
+        if integer_only:
+            out = np.where(whole == k, out, 0.0)
+        return _scalar_or_array(out)
+
+    def pmf(self, k):
+        return self._lookup(self.pmf_values, k, 0.0, 0.0, integer_only=True)
+
+    def cdf(self, k):
+        return self._lookup(self.cdf_values, k, 0.0, 1.0)
+
+    def sf(self, k):
+        return self._lookup(self.sf_values, k, 1.0, 0.0)
+
+
+def _frozen_table(pmf, cdf, sf) -> DiscreteTable:
+    arrays = [np.ascontiguousarray(a, dtype=float) for a in (pmf, cdf, sf)]
+    for arr in arrays:
+        arr.flags.writeable = False
+    return DiscreteTable(*arrays)
+
+
+@functools.lru_cache(maxsize=128)
+def binomial_table(n: int, p: float) -> DiscreteTable:
+    """
+    Cached Binomial(n, p) table over ``k = 0..n``.
+
+    Repeated calls with the same parameters (for example in an A/B test
+    monitoring loop) return the same read-only table, so each probability
+    becomes an array lookup.
+    """
+    if int(n) != n:
+        raise ValueError("n must be a non-negative integer.")
+    k = np.arange(int(n) + 1)
+    with span("stats.binomial_table", items=k.size):
+        return _frozen_table(
+            binomial_pmf(k, n, p), binomial_cdf(k, n, p), binomial_sf(k, n, p)
+        )
+
+
+@functools.lru_cache(maxsize=128)
+def poisson_table(mu: float) -> DiscreteTable:
+    """Cached Poisson(mu) table, truncated where the remaining mass is below 1e-15."""
+    mu = float(_check_rate(mu))
+    k_max = int(np.ceil(mu + 10 * np.sqrt(mu) + 40))
+    k = np.arange(k_max + 1)
+    with span("stats.poisson_table", items=k.size):
+        return _frozen_table(poisson_pmf(k, mu), poisson_cdf(k, mu), poisson_sf(k, mu))
+
+
+def _frequency_weights(values: np.ndarray, weights):
+    """Validate `weights` as non-negative frequency counts aligned with `values`."""
+    w = np.asarray(weights, dtype=float).ravel()
+    if w.shape != values.shape:
+        raise ValueError("weights must have one entry per value.")
+    if not np.all(np.isfinite(w)) or np.any(w < 0):
+        raise ValueError("weights must be finite and non-negative.")
+    return w
+
+
+@instrumented("stats.sample_mean", size=lambda values, *_, **__: input_size(values))
+def sample_mean(
+    values: Iterable[float], weights: Optional[Iterable[float]] = None
+) -> float:
+    """
+    Return the arithmetic mean ignoring NaN values.
+
+    With `weights`, each value counts as many times as its weight (for
+    pre-aggregated ``(value, count)`` data), without expanding the rows.
+    """
     arr = np.asarray(list(values), dtype=float)
+    record_bytes("stats.sample_mean", copied=arr.nbytes)
     if arr.size == 0:
         raise ValueError("values must contain at least one element")
-    return float(np.nanmean(arr))
\ No newline at end of file
+    if weights is None:
+        return float(np.nanmean(arr))
+
+    w = _frequency_weights(arr, list(weights))
+    mask = ~np.isnan(arr)
+    total = w[mask].sum()
+    if total == 0:
+        raise ValueError("weights of the non-NaN values must not all be zero.")
+    return float(np.dot(w[mask], arr[mask]) / total)
+
+
+def _k_scale(q: np.ndarray, compression: float) -> np.ndarray:
+    """t-digest k1 scale: small clusters near the tails, large near the median."""
+    return compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)
+
+
+class QuantileSketch:
+    """
+    Mergeable t-digest style sketch for approximate quantiles and ECDFs.
+
+    The sketch keeps at most about `compression` weighted centroids (plus a
+    small buffer of raw values), so memory is bounded no matter how many
+    values are added. Centroids are sized with the k1 scale function, which
+    bounds the weight of a centroid at quantile q to roughly
+    ``pi * sqrt(q * (1 - q)) * n / compression``. The rank error of a
+    quantile is at most about half of that: ~0.8% of n at the median and
+    much less in the tails for the default ``compression=200``. The
+    minimum and maximum are kept exactly.
+
+    Sketches built on separate chunks or processes can be combined with
+    `merge`, and serialized with `to_bytes` / `from_bytes`.
+    """
+
+    def __init__(self, compression: float = 200.0, buffer_size: Optional[int] = None):
+        if compression < 10:
+            raise ValueError("compression must be at least 10.")
+        self.compression = float(compression)
+        self.buffer_size = int(buffer_size or 10 * compression)
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer: list = []
+        self._buffered = 0
+        self.count = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @instrumented(
+        "stats.QuantileSketch.update",
+        size=lambda self, values, *_, **__: input_size(np.asarray(values)),
+    )
+    def update(self, values, weights=None) -> "QuantileSketch":
+        """
+        Add a batch of values (NaN values are ignored).
+
+        `weights` are optional frequency counts, as in `sample_mean`.
+        """
+        x = np.asarray(values, dtype=float).ravel()
+        w = np.ones_like(x) if weights is None else _frequency_weights(x, weights)
+        keep = ~np.isnan(x) & (w > 0)
+        x, w = x[keep], w[keep]
+        if x.size == 0:
+            return self
+        self.count += float(w.sum())
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._buffer.append((x, w))
+        self._buffered += x.size
+        if self._buffered >= self.buffer_size:
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold the centroids of `other` into this sketch."""
+        other._compress()
+        if other.count == 0:
+            return self
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._buffer.append((other._means, other._weights))
+        self._buffered += other._means.size
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        means = np.concatenate([self._means] + [m for m, _ in self._buffer])
+        weights = np.concatenate([self._weights] + [w for _, w in self._buffer])
+        self._buffer.clear()
+        self._buffered = 0
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Each item joins the unit-wide k bucket of its center rank.
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(_k_scale(q_mid, self.compression)).astype(np.intp)
+        new_cluster = np.ones(k.size, dtype=bool)
+        new_cluster[1:] = k[1:] != k[:-1]
+        cluster = np.cumsum(new_cluster) - 1
+        self._weights = np.bincount(cluster, weights=weights)
+        self._means = np.bincount(cluster, weights=weights * means) / self._weights
+
+    def __len__(self) -> int:
+        """Number of centroids currently stored (after compression)."""
+        self._compress()
+        return int(self._means.size)
+
+    def _knots(self):
+        """Cumulative weight at each centroid center, framed by min and max."""
+        self._compress()
+        if self.count == 0:
+            raise ValueError("the sketch is empty.")
+        centers = np.cumsum(self._weights) - self._weights / 2
+        ranks = np.concatenate(([0.0], centers, [self.count]))
+        values = np.concatenate(([self.min], self._means, [self.max]))
+        return ranks, values
+
+    def quantile(self, q):
+        """Approximate quantile(s) for `q` in [0, 1]; accepts scalars or arrays."""
+        q_arr = np.asarray(q, dtype=float)
+        if np.any((q_arr < 0) | (q_arr > 1)):
+            raise ValueError("q must be between 0 and 1.")
+        ranks, values = self._knots()
+        result = np.interp(q_arr * self.count, ranks, values)
+        return float(result) if result.ndim == 0 else result
+
+    def cdf(self, x):
+        """Approximate ECDF evaluated at `x` (scalar or array)."""
+        ranks, values = self._knots()
+        result = np.interp(np.asarray(x, dtype=float), values, ranks) / self.count
+        return float(result) if result.ndim == 0 else result
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketch (for example, to merge results across processes)."""
+        self._compress()
+        header = np.array(
+            [self.compression, self.buffer_size, self.count, self.min, self.max]
+        )
+        return np.concatenate([header, self._means, self._weights]).tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "QuantileSketch":
+        """Rebuild a sketch serialized with `to_bytes`."""
+        data = np.frombuffer(payload, dtype=float)
+        if data.size < 5 or (data.size - 5) % 2:
+            raise ValueError("payload is not a serialized QuantileSketch.")
+        sketch = cls(compression=data[0], buffer_size=int(data[1]))
+        sketch.count, sketch.min, sketch.max = (float(v) for v in data[2:5])
+        sketch._means, sketch._weights = np.split(data[5:].copy(), 2)
+        return sketch
@@ -1,2 +1,411 @@
 # -*- coding: utf-8 -*-
-"""Módulo para funções de visualização padronizadas."""
+"""
+Módulo para funções de visualização padronizadas.
+
+Cada função reduz a entrada com NumPy (bins, histogramas 2D ou amostragem
+estratificada) antes de passar qualquer coisa ao matplotlib, então o número
+de elementos desenhados, e com ele o tempo de renderização, depende dos
+argumentos `bins`/`max_points` e não do tamanho dos dados.
+
+O matplotlib é importado no primeiro uso, então importar este módulo é
+barato.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+
+def _axes(ax):
+    """Retorna `ax` ou um novo eixo em uma nova figura."""
+    if ax is None:
+        import matplotlib.pyplot as plt
+
+        _, ax = plt.subplots()
+    return ax
+
+
+def _finite_1d(values: Any, name: str) -> np.ndarray:
+    arr = np.asarray(values, dtype=float).ravel()
+    arr = arr[np.isfinite(arr)]
+    if arr.size == 0:
+        raise ValueError(f"{name} must contain at least one finite value.")
+    return arr
+
+
+def _finite_pairs(x: Any, y: Any) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if x.shape != y.shape:
+        raise ValueError("x and y must have the same number of samples.")
+    mask = np.isfinite(x) & np.isfinite(y)
+    if not mask.any():
+        raise ValueError("x and y must contain at least one finite pair.")
+    return x[mask], y[mask]
+
+
+def stratified_sample(
+    n: int,
+    max_points: int,
+    strata: Optional[Any] = None,
+    seed: Optional[int] = 0,
+) -> np.ndarray:
+    """
+    Retorna os índices ordenados de uma amostra de até `max_points` linhas.
+
+    Com `strata`, cada grupo fica com uma linha mais uma parte do restante
+    proporcional ao seu tamanho, para que categorias raras não sumam do
+    gráfico. Com mais grupos que `max_points`, sorteia `max_points` grupos e
+    uma linha de cada, então o total nunca passa de `max_points`.
+    """
+    if max_points <= 0:
+        raise ValueError("max_points must be positive.")
+    if n <= max_points:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return np.sort(rng.choice(n, size=max_points, replace=False))
+
+    _, codes = np.unique(np.asarray(strata), return_inverse=True)
+    if codes.size != n:
+        raise ValueError("strata must have one label per row.")
+    counts = np.bincount(codes)
+    n_strata = counts.size
+    if n_strata >= max_points:
+        quota = np.zeros(n_strata, dtype=int)
+        quota[rng.choice(n_strata, size=max_points, replace=False)] = 1
+    else:
+        # Uma linha por grupo; o restante é dividido pelo maior resto, de modo
+        # que a soma das cotas é exatamente `max_points`.
+        share = (counts - 1) * (max_points - n_strata) / (n - n_strata)
+        quota = 1 + np.floor(share).astype(int)
+        leftover = max_points - int(quota.sum())
+        quota[np.argsort(np.floor(share) - share, kind="stable")[:leftover]] += 1
+
+    # Ordena por grupo com uma chave aleatória e pega os `quota` primeiros de cada.
+    order = np.lexsort((rng.random(n), codes))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n) - np.repeat(starts, counts)
+    picked = order[rank < np.repeat(quota, counts)]
+    return np.sort(picked)
+
+
+def hist_plot(values: Any, bins: int = 50, ax=None, **kwargs):
+    """Histograma a partir das contagens de `np.histogram` (um único artista)."""
+    arr = _finite_1d(values, "values")
+    counts, edges = np.histogram(arr, bins=bins)
+    ax = _axes(ax)
+    ax.stairs(counts, edges, fill=True, **kwargs)
+    ax.set_ylabel("Frequência")
+    return ax
+
+
+def density_plot(x: Any, y: Any, gridsize: int = 200, ax=None, cmap: str = "viridis"):
+    """Desenha um histograma 2D dos pares (x, y), em escala log, como imagem."""
+    from matplotlib.colors import LogNorm
+
+    x, y = _finite_pairs(x, y)
+    counts, xedges, yedges = np.histogram2d(x, y, bins=gridsize)
+    counts = np.ma.masked_equal(counts.T, 0)
+    ax = _axes(ax)
+    mesh = ax.pcolormesh(xedges, yedges, counts, cmap=cmap, norm=LogNorm())
+    ax.figure.colorbar(mesh, ax=ax, label="Contagem")
+    return ax
+
+
+def scatter_plot(
+    x: Any,
+    y: Any,
+    max_points: int = 20_000,
+    method: str = "density",
+    strata: Optional[Any] = None,
+    gridsize: int = 200,
+    seed: Optional[int] = 0,
+    ax=None,
+    **kwargs,
+):
+    """
+    Gráfico de dispersão que usa uma visão reduzida para entradas grandes.
+
+    Até `max_points` pares são desenhados como estão. Acima disso,
+    ``method="density"`` desenha um histograma 2D (veja `density_plot`) e
+    ``method="sample"`` desenha uma amostra estratificada de `max_points`
+    pares.
+    """
+    if method not in ("density", "sample"):
+        raise ValueError("method must be 'density' or 'sample'.")
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if x.shape != y.shape:
+        raise ValueError("x and y must have the same number of samples.")
+
+    if x.size > max_points and method == "density":
+        return density_plot(x, y, gridsize=gridsize, ax=ax)
+
+    idx = stratified_sample(x.size, max_points, strata=strata, seed=seed)
+    ax = _axes(ax)
+    kwargs.setdefault("s", 4)
+    kwargs.setdefault("alpha", 0.5)
+    ax.scatter(x[idx], y[idx], **kwargs)
+    return ax
+
+
+def ecdf_plot(values: Any, max_points: int = 2_000, ax=None, **kwargs):
+    """
+    Desenha a distribuição acumulada empírica em até `max_points` pontos.
+
+    Entradas pequenas usam a função escada exata; as maiores são agrupadas
+    com `np.histogram`, que é exato em cada borda e evita ordenar os dados.
+    """
+    arr = _finite_1d(values, "values")
+    if arr.size <= max_points:
+        xs = np.sort(arr)
+        ys = np.arange(1, arr.size + 1) / arr.size
+    else:
+        counts, edges = np.histogram(arr, bins=max_points)
+        xs = edges[1:]
+        ys = np.cumsum(counts) / arr.size
+    ax = _axes(ax)
+    ax.step(xs, ys, where="post", **kwargs)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Proporção acumulada")
+    return ax
+
+
+def residual_plot(
+    y_true: Any, y_pred: Any, max_points: int = 20_000, ax=None, **kwargs
+):
+    """Desenha os resíduos contra os valores ajustados, com referência em zero."""
+    y_true, y_pred = _finite_pairs(y_true, y_pred)
+    ax = scatter_plot(y_pred, y_true - y_pred, max_points=max_points, ax=ax, **kwargs)
+    ax.axhline(0.0, color="black", linewidth=1, linestyle="--")
+    ax.set_xlabel("Valores ajustados")
+    ax.set_ylabel("Resíduos")
+    return ax
+
+
+def binned_roc_curve(
+    y_true: Any, y_score: Any, bins: int = 1_000
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Retorna (fpr, tpr) calculados a partir das contagens de classe por bin.
+
+    Os scores são agrupados em `bins` bins de mesma largura, então a curva
+    tem no máximo ``bins + 1`` pontos e é montada com um só `np.bincount`.
+    """
+    y_true = np.asarray(y_true).ravel()
+    y_score = np.asarray(y_score, dtype=float).ravel()
+    if y_true.shape != y_score.shape:
+        raise ValueError("y_true and y_score must have the same number of samples.")
+    positives = y_true == 1
+    n_pos = int(positives.sum())
+    n_neg = y_true.size - n_pos
+    if n_pos == 0 or n_neg == 0:
+        raise ValueError("y_true must contain both classes.")
+
+    lo, hi = y_score.min(), y_score.max()
+    span = hi - lo if hi > lo else 1.0
+    idx = np.minimum(((y_score - lo) / span * bins).astype(int), bins - 1)
+    pos = np.bincount(idx, weights=positives, minlength=bins)
+    neg = np.bincount(idx, weights=~positives, minlength=bins)
+
+    # Percorre os bins do maior para o menor score (limiar decrescente).
+    tpr = np.concatenate(([0.0], np.cumsum(pos[::-1]) / n_pos))
+    fpr = np.concatenate(([0.0], np.cumsum(neg[::-1]) / n_neg))
+    return fpr, tpr
+
+
+def roc_curve_plot(y_true: Any, y_score: Any, bins: int = 1_000, ax=None, **kwargs):
+    """Desenha a curva ROC de `binned_roc_curve` com a diagonal do acaso."""
+    fpr, tpr = binned_roc_curve(y_true, y_score, bins=bins)
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+    ax = _axes(ax)
+    kwargs.setdefault("label", f"AUC = {auc:.3f}")
+    ax.plot(fpr, tpr, **kwargs)
+    ax.plot([0, 1], [0, 1], color="grey", linestyle="--", linewidth=1)
+    ax.set_xlabel("Taxa de falsos positivos")
+    ax.set_ylabel("Taxa de verdadeiros positivos")
+    ax.legend(loc="lower right")
+    return ax
+
+
+# Tipos de gráfico aceitos em `FigureSpec.kind`.
+PLOT_KINDS = {
+    "hist": hist_plot,
+    "scatter": scatter_plot,
+    "density": density_plot,
+    "ecdf": ecdf_plot,
+    "residual": residual_plot,
+    "roc": roc_curve_plot,
+}
+
+RENDER_MANIFEST = ".render_cache.json"
+
+
+@dataclass
+class FigureSpec:
+    """
+    Descrição de uma figura para `render_figures`.
+
+    `data` guarda os argumentos com arrays da função indicada por `kind`
+    (por exemplo ``{"values": arr}`` para ``"hist"``) e `options` os demais
+    argumentos nomeados. As specs são serializadas para os processos, então
+    devem conter apenas dados simples.
+    """
+
+    name: str
+    kind: str
+    data: dict[str, Any]
+    options: dict[str, Any] = field(default_factory=dict)
+    formats: tuple[str, ...] = ("png",)
+    title: Optional[str] = None
+    figsize: tuple[float, float] = (6.4, 4.8)
+    dpi: int = 100
+
+
+def _update_array(digest, key: str, value: Any) -> None:
+    arr = np.ascontiguousarray(value)
+    digest.update(f"{key}:{arr.dtype.str}:{arr.shape}".encode())
+    if arr.dtype.hasobject:
+        digest.update(repr(arr.tolist()).encode())
+    else:
+        digest.update(memoryview(arr).cast("B"))
+
+
+def _is_array(value: Any) -> bool:
+    # Inclui escalares do NumPy, que o json não serializa.
+    return hasattr(value, "__array__")
+
+
+def spec_hash(spec: FigureSpec) -> str:
+    """
+    Hash dos parâmetros da spec junto com os bytes dos dados.
+
+    Opções com arrays (por exemplo `strata`) são hasheadas pelos bytes, como
+    `data`; as demais precisam ser serializáveis em JSON.
+    """
+    digest = hashlib.sha256()
+    arrays = sorted(key for key, value in spec.options.items() if _is_array(value))
+    meta = {
+        "kind": spec.kind,
+        "options": {k: v for k, v in spec.options.items() if k not in arrays},
+        "array_options": arrays,
+        "formats": list(spec.formats),
+        "title": spec.title,
+        "figsize": list(spec.figsize),
+        "dpi": spec.dpi,
+        "data": sorted(spec.data),
+    }
+    try:
+        digest.update(json.dumps(meta, sort_keys=True).encode())
+    except TypeError as exc:
+        message = f"options of figure spec '{spec.name}' must be JSON or arrays."
+        raise ValueError(message) from exc
+    for key in sorted(spec.data):
+        _update_array(digest, key, spec.data[key])
+    for key in arrays:
+        _update_array(digest, f"options.{key}", spec.options[key])
+    return digest.hexdigest()
+
+
+def _use_agg() -> None:
+    """Inicializador dos processos: renderização sem interface gráfica."""
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+
+
+def _render_spec(spec: FigureSpec, output_dir: Path) -> list[Path]:
+    """Renderiza uma spec em cada um dos formatos pedidos."""
+    from matplotlib.figure import Figure
+
+    # Figura fora do pyplot: não fica registrada nem precisa ser fechada.
+    fig = Figure(figsize=spec.figsize, dpi=spec.dpi)
+    ax = fig.add_subplot()
+    PLOT_KINDS[spec.kind](**spec.data, **spec.options, ax=ax)
+    if spec.title:
+        ax.set_title(spec.title)
+    fig.tight_layout()
+
+    paths = []
+    for fmt in spec.formats:
+        path = output_dir / f"{spec.name}.{fmt}"
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def render_figures(
+    specs: Iterable[FigureSpec],
+    output_dir: Path,
+    max_workers: Optional[int] = None,
+    force: bool = False,
+) -> dict:
+    """
+    Renderiza as specs em um pool de processos com o backend Agg.
+
+    Um manifesto em `output_dir` guarda o `spec_hash` de cada figura
+    renderizada; specs com hash inalterado e cujos arquivos ainda existem
+    são puladas, a menos que `force` seja True.
+
+    Returns:
+        dict: nomes em ``rendered`` e ``skipped`` e os arquivos gravados em
+              ``files``.
+    """
+    specs = list(specs)
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("figure spec names must be unique.")
+    for spec in specs:
+        if spec.kind not in PLOT_KINDS:
+            kinds = sorted(PLOT_KINDS)
+            raise ValueError(
+                f"unknown figure kind '{spec.kind}'; expected one of {kinds}."
+            )
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / RENDER_MANIFEST
+    manifest = {}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    pending, skipped = [], []
+    hashes = {}
+    for spec in specs:
+        hashes[spec.name] = spec_hash(spec)
+        up_to_date = manifest.get(spec.name) == hashes[spec.name] and all(
+            (output_dir / f"{spec.name}.{fmt}").exists() for fmt in spec.formats
+        )
+        if up_to_date and not force:
+            skipped.append(spec.name)
+        else:
+            pending.append(spec)
+
+    rendered, files = [], []
+    try:
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_use_agg
+            ) as pool:
+                futures = {
+                    pool.submit(_render_spec, spec, output_dir): spec.name
+                    for spec in pending
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    files.extend(future.result())
+                    rendered.append(name)
+                    manifest[name] = hashes[name]
+    finally:
+        # Salva o progresso mesmo se alguma figura falhar.
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    return {"rendered": sorted(rendered), "skipped": skipped, "files": sorted(files)}
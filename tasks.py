@@ -11,17 +11,34 @@ Tarefas disponíveis:
   - lint: Analisa o código com ruff.
   - test: Executa os testes.
   - data: Baixa os datasets.
+  - bench [--save] [--threshold F]: Executa os benchmarks de desempenho e
+    compara com a baseline salva.
   - notebook <nome>: Executa um notebook específico.
+  - notebooks [--workers N] [--timeout S] [--force] [--warm]: Executa todos
+    os notebooks em paralelo, pulando os que não mudaram desde a última
+    execução. --warm usa interpretadores com a pilha científica pré-carregada.
   - help: Mostra esta mensagem.
 """
+import argparse
+import hashlib
+import json
+import os
+import shlex
 import subprocess
 import sys
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Pega o caminho para o executável do Python que está rodando o script
 PYTHON_EXEC = sys.executable
 
+# Arquivo com os hashes dos notebooks executados com sucesso
+NOTEBOOK_CACHE = Path(".notebooks_cache.json")
+# Entradas compartilhadas pelos notebooks: dados e código reutilizável
+NOTEBOOK_INPUTS = [Path("data"), Path("src")]
+
 
 def check_python_module(module_name):
     """Verifica se um módulo Python está disponível."""
@@ -62,67 +79,6 @@ def install_jupyter():
         return False
 
 
-def convert_notebook_to_script(notebook_path):
-    """Converte um notebook para um script Python executável."""
-    try:
-        import json
-
-        with open(notebook_path, "r", encoding="utf-8") as f:
-            notebook = json.load(f)
-
-        script_lines = []
-        script_lines.append(
-            f"# Convertido automaticamente do notebook: {notebook_path.name}"
-        )
-        script_lines.append("# Execute este script como alternativa ao notebook\n")
-
-        for cell in notebook.get("cells", []):
-            if cell.get("cell_type") == "code":
-                source = cell.get("source", [])
-                if source:
-                    script_lines.append("# " + "-" * 50)
-                    # Junta as linhas de código da célula
-                    if isinstance(source, list):
-                        code = "".join(source)
-                    else:
-                        code = source
-                    script_lines.append(code)
-                    script_lines.append("")
-
-        script_path = notebook_path.parent / f"{notebook_path.stem}_converted.py"
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(script_lines))
-
-        return script_path
-
-    except Exception as e:
-        return None
-
-
-def execute_notebook_as_script(notebook_path):
-    """Executa um notebook convertendo-o para script Python."""
-    script_path = convert_notebook_to_script(notebook_path)
-
-    if not script_path:
-        return False, "Erro ao converter notebook para script Python"
-
-    try:
-        print(f"--- Convertendo para script: {script_path.name} ---")
-        result = subprocess.run(
-            [PYTHON_EXEC, str(script_path)], check=True, cwd=notebook_path.parent
-        )
-
-        # Remove o arquivo de script temporário
-        script_path.unlink()
-
-        return True, "Notebook executado com sucesso como script Python"
-
-    except subprocess.CalledProcessError as e:
-        if script_path.exists():
-            script_path.unlink()  # Remove o arquivo temporário
-        return False, f"Erro ao executar script Python: {e}"
-
-
 # Dicionário que mapeia o nome da tarefa ao comando a ser executado
 COMMANDS = {
     "setup": {
@@ -145,6 +101,10 @@ COMMANDS = {
         "description": "Baixa os datasets de exemplo.",
         "command": f'"{PYTHON_EXEC}" run_loaders.py',
     },
+    "bench": {
+        "description": "Executa os benchmarks e compara com a baseline (--save grava uma nova).",
+        "command": f'"{PYTHON_EXEC}" -m benchmarks.suite',
+    },
 }
 
 
@@ -171,18 +131,191 @@ def run_notebook(notebook_identifier):
 
     print(f"--- Executando notebook: {nb_path} ---")
     # Comando para executar o notebook no lugar, salvando a saída no mesmo diretório
-    command = f'"{PYTHON_EXEC}" -m nbconvert --to notebook --execute "{nb_path}" --output-dir="{nb_path.parent}" --inplace'
+    command = [
+        PYTHON_EXEC,
+        "-m",
+        "nbconvert",
+        "--to",
+        "notebook",
+        "--execute",
+        str(nb_path),
+        f"--output-dir={nb_path.parent}",
+        "--inplace",
+    ]
 
     try:
-        subprocess.run(command, check=True, shell=True)
+        subprocess.run(command, check=True)
         print(f"--- Notebook '{nb_path.name}' executado com sucesso! ---")
     except subprocess.CalledProcessError:
         print(f"\nERRO ao executar o notebook '{nb_path.name}'.", file=sys.stderr)
         sys.exit(1)
 
 
-def run_task(task_name):
-    """Executa uma tarefa específica do dicionário COMMANDS."""
+def hash_notebook_source(nb_path):
+    """Calcula o hash das células do notebook, ignorando saídas e metadados."""
+    with open(nb_path, "r", encoding="utf-8") as f:
+        notebook = json.load(f)
+    digest = hashlib.sha256()
+    for cell in notebook.get("cells", []):
+        source = cell.get("source", [])
+        if isinstance(source, list):
+            source = "".join(source)
+        digest.update(cell.get("cell_type", "").encode())
+        digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_paths(paths):
+    """Calcula o hash do conteúdo de todos os arquivos sob os caminhos dados."""
+    digest = hashlib.sha256()
+    for root in paths:
+        files = [root] if root.is_file() else sorted(root.rglob("*"))
+        for file_path in files:
+            if not file_path.is_file() or "__pycache__" in file_path.parts:
+                continue
+            digest.update(str(file_path.as_posix()).encode())
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def notebook_command(nb_path, runner):
+    """Monta o comando (lista, sem shell) para executar o notebook no lugar."""
+    if runner == "papermill":
+        return [PYTHON_EXEC, "-m", "papermill", str(nb_path), str(nb_path)]
+    return [
+        PYTHON_EXEC,
+        "-m",
+        "jupyter",
+        "nbconvert",
+        "--to",
+        "notebook",
+        "--execute",
+        "--inplace",
+        str(nb_path),
+    ]
+
+
+def execute_notebook_timed(nb_path, runner, timeout):
+    """Executa um notebook e retorna (status, segundos, mensagem)."""
+    start = time.perf_counter()
+    try:
+        subprocess.run(
+            notebook_command(nb_path, runner),
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        return "ok", time.perf_counter() - start, ""
+    except subprocess.TimeoutExpired:
+        return "timeout", time.perf_counter() - start, f"excedeu {timeout}s"
+    except subprocess.CalledProcessError as e:
+        last_line = (e.stderr or "").strip().splitlines()[-1:] or [str(e)]
+        return "erro", time.perf_counter() - start, last_line[0]
+
+
+def run_all_notebooks(workers=None, timeout=600, force=False, warm=False):
+    """
+    Executa todos os notebooks em paralelo, com cache por hash.
+
+    Com `warm` (ou sem jupyter/papermill instalados), usa o pool de
+    interpretadores quentes de `notebook_runner`, que não grava as saídas
+    no .ipynb mas evita reimportar a pilha científica a cada notebook.
+    """
+    notebook_files = sorted(Path("notebooks").rglob("*.ipynb"))
+    notebook_files = [p for p in notebook_files if ".ipynb_checkpoints" not in p.parts]
+    if not notebook_files:
+        print("\nERRO: Nenhum notebook encontrado em 'notebooks/'.", file=sys.stderr)
+        sys.exit(1)
+
+    runner = None if warm else get_available_notebook_runner()
+    if runner is None:
+        print("--- Usando o executor interno com interpretadores quentes ---")
+
+    cache = {}
+    if NOTEBOOK_CACHE.exists() and not force:
+        cache = json.loads(NOTEBOOK_CACHE.read_text(encoding="utf-8"))
+
+    inputs_hash = hash_paths([p for p in NOTEBOOK_INPUTS if p.exists()])
+    keys = {}
+    results = {}
+    pending = []
+    for nb_path in notebook_files:
+        key = hashlib.sha256(
+            (hash_notebook_source(nb_path) + inputs_hash).encode()
+        ).hexdigest()
+        keys[nb_path] = key
+        if cache.get(str(nb_path.as_posix())) == key:
+            results[nb_path] = ("cache", 0.0, "")
+        else:
+            pending.append(nb_path)
+
+    workers = workers or min(len(pending), os.cpu_count() or 1) or 1
+    print(
+        f"--- Executando {len(pending)} notebook(s) com {workers} worker(s) "
+        f"({len(notebook_files) - len(pending)} em cache) ---"
+    )
+
+    total_start = time.perf_counter()
+    if runner is None and pending:
+        from notebook_runner import run_notebooks
+
+        outcome = run_notebooks(pending, workers=workers, timeout=timeout)
+        for nb_path, result in zip(pending, outcome):
+            status = "ok" if result.ok else "erro"
+            message = result.error.strip().splitlines()[-1] if result.error else ""
+            results[nb_path] = (status, result.seconds, message)
+            if result.ok:
+                cache[str(nb_path.as_posix())] = keys[nb_path]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(execute_notebook_timed, nb_path, runner, timeout): nb_path
+                for nb_path in pending
+            }
+            for future in as_completed(futures):
+                nb_path = futures[future]
+                results[nb_path] = future.result()
+                status, seconds, _ = results[nb_path]
+                print(f"    [{status}] {nb_path} ({seconds:.1f}s)")
+                if status == "ok":
+                    cache[str(nb_path.as_posix())] = keys[nb_path]
+    total = time.perf_counter() - total_start
+
+    NOTEBOOK_CACHE.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+
+    # Tabela de resumo com o tempo de cada notebook
+    width = max(len(str(p)) for p in notebook_files)
+    print(f"\n{'Notebook':<{width}}  {'Status':<8}  {'Tempo (s)':>9}")
+    print("-" * (width + 21))
+    for nb_path in notebook_files:
+        status, seconds, message = results[nb_path]
+        print(f"{str(nb_path):<{width}}  {status:<8}  {seconds:>9.1f}")
+        if message:
+            print(f"{'':<{width}}    -> {message}")
+    print("-" * (width + 21))
+    print(f"{'Total (wall-clock)':<{width}}  {'':<8}  {total:>9.1f}")
+
+    failures = [p for p, r in results.items() if r[0] not in ("ok", "cache")]
+    if failures:
+        print(f"\nERRO: {len(failures)} notebook(s) falharam.", file=sys.stderr)
+        sys.exit(1)
+
+
+def parse_notebooks_args(argv):
+    """Lê as opções da tarefa 'notebooks'."""
+    parser = argparse.ArgumentParser(prog="python tasks.py notebooks")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--warm", action="store_true")
+    return parser.parse_args(argv)
+
+
+def run_task(task_name, extra_args=()):
+    """Executa uma tarefa do dicionário COMMANDS, repassando argumentos extras."""
     if task_name not in COMMANDS:
         print(f"\nERRO: Tarefa '{task_name}' não encontrada.", file=sys.stderr)
         print_help()
@@ -193,7 +326,10 @@ def run_task(task_name):
     print(f"    {task['description']}")
 
     try:
-        subprocess.run(task["command"], check=True, shell=True)
+        command = task["command"]
+        if extra_args:
+            command = f"{command} {shlex.join(extra_args)}"
+        subprocess.run(command, check=True, shell=True)
         print(f"--- Tarefa '{task_name}' concluída com sucesso! ---")
     except subprocess.CalledProcessError:
         print(f"\nERRO ao executar a tarefa '{task_name}'.", file=sys.stderr)
@@ -209,6 +345,9 @@ def print_help():
     print(
         f"  {'notebook':<10} - Executa um notebook específico. Ex: python tasks.py notebook normal_distribution"
     )
+    print(
+        f"  {'notebooks':<10} - Executa todos os notebooks em paralelo (com cache). Ex: python tasks.py notebooks --workers 4 --timeout 300"
+    )
 
 
 if __name__ == "__main__":
@@ -230,5 +369,13 @@ if __name__ == "__main__":
             sys.exit(1)
         notebook_identifier = args[1]
         run_notebook(notebook_identifier)
+    elif task_to_run == "notebooks":
+        options = parse_notebooks_args(args[1:])
+        run_all_notebooks(
+            workers=options.workers,
+            timeout=options.timeout,
+            force=options.force,
+            warm=options.warm,
+        )
     else:
-        run_task(task_to_run)
+        run_task(task_to_run, args[1:])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Tests for the benchmark suite helpers."""
+import numpy as np
+import pytest
+
+from benchmarks import suite
+
+
+def test_compare_results_flags_time_and_memory_regressions():
+    baseline = {
+        "a[10]": {"seconds": 1.0, "peak_bytes": 1_000_000},
+        "b[10]": {"seconds": 1.0, "peak_bytes": 100},
+    }
+    current = {
+        "a[10]": {"seconds": 1.5, "peak_bytes": 2_000_000},
+        "b[10]": {"seconds": 1.1, "peak_bytes": 400},
+        "new[10]": {"seconds": 9.0, "peak_bytes": 9},
+    }
+
+    regressions = suite.compare_results(current, baseline, threshold=0.25)
+
+    assert len(regressions) == 2
+    assert all(message.startswith("a[10]") for message in regressions)
+
+
+def test_run_suite_measures_every_size(tmp_path):
+    bench = suite.Benchmark("sum", sum, lambda size: (range(size),), (10, 100))
+
+    results = suite.run_suite([bench], repeat=1, echo=False)
+
+    assert set(results) == {"sum[10]", "sum[100]"}
+    assert results["sum[100]"]["seconds"] > 0
+    path = tmp_path / "baseline.json"
+    suite.save_results(path, results)
+    assert suite.load_results(path) == results
+
+
+def test_memory_is_tracked_per_case():
+    pa = pytest.importorskip("pyarrow")
+
+    def allocate():
+        return pa.array(np.arange(1_000_000))
+
+    kept = []
+    arrow = suite.measure(lambda: kept.append(allocate()), (), repeat=1, memory="arrow")
+    assert arrow["peak_bytes"] >= 8_000_000
+
+    untracked = suite.measure(sum, ([1, 2],), repeat=1, memory=None)
+    assert untracked["peak_bytes"] is None
+    baseline = {"x[1]": {"seconds": 1.0, "peak_bytes": 10}}
+    assert suite.compare_results({"x[1]": untracked | {"seconds": 1.0}}, baseline) == []
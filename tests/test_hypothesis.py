@@ -1,6 +1,8 @@
 ﻿# -*- coding: utf-8 -*-
 """Tests for the hypothesis module."""
 import numpy as np
+import pandas as pd
+import pytest
 
 from src.stats import hypothesis
 
@@ -25,4 +27,130 @@ def test_chi_square_independence_expected_shapes():
     assert 0 <= pvalue <= 1
     assert dof == 1
     assert expected.shape == table.shape
-    assert residuals.shape == table.shape
\ No newline at end of file
+    assert residuals.shape == table.shape
+
+
+def test_permutation_test_matches_welch_and_is_reproducible():
+    rng = np.random.default_rng(7)
+    sample_a = rng.exponential(1.0, size=80)
+    sample_b = rng.exponential(1.6, size=90)
+
+    stat, pvalue = hypothesis.permutation_test(
+        sample_a, sample_b, n_permutations=2_000, statistic="t", seed=3
+    )
+    welch_stat, welch_p = hypothesis.two_sample_ttest(sample_a, sample_b)
+
+    assert stat == pytest.approx(welch_stat)
+    assert pvalue == pytest.approx(welch_p, abs=0.02)
+
+    serial = hypothesis.permutation_test(
+        sample_a, sample_b, n_permutations=600, batch_size=100, seed=11
+    )
+    parallel = hypothesis.permutation_test(
+        sample_a, sample_b, n_permutations=600, batch_size=100, seed=11, n_jobs=2
+    )
+    assert serial == parallel
+
+
+def test_permutation_test_validates_arguments():
+    with pytest.raises(ValueError):
+        hypothesis.permutation_test([1.0, 2.0], [3.0, 4.0], statistic="median")
+    with pytest.raises(ValueError):
+        hypothesis.permutation_test([1.0], [3.0, 4.0], statistic="t")
+
+
+def test_anova_by_and_kruskal_by_match_scipy_per_test():
+    from scipy import stats
+
+    rng = np.random.default_rng(5)
+    frame = pd.DataFrame(
+        {
+            "agency": np.repeat(["NYPD", "DOT", "DSNY"], 60),
+            "borough": np.tile(np.repeat(["BRONX", "QUEENS", "BROOKLYN"], 20), 3),
+            "hours": np.round(rng.exponential(5.0, size=180), 0),
+        }
+    )
+    frame.loc[frame["agency"] == "DSNY", "borough"] = "BRONX"
+
+    anova = hypothesis.anova_by(frame, "hours", "borough", "agency")
+    kruskal = hypothesis.kruskal_by(frame, "hours", "borough", "agency")
+
+    assert list(anova["agency"]) == ["DOT", "DSNY", "NYPD"]
+    for row, agency in [(0, "DOT"), (2, "NYPD")]:
+        subset = frame[frame["agency"] == agency]
+        groups = [g["hours"].to_numpy() for _, g in subset.groupby("borough")]
+        f_ref = stats.f_oneway(*groups)
+        h_ref = stats.kruskal(*groups)
+        assert anova.loc[row, "f_stat"] == pytest.approx(f_ref.statistic)
+        assert anova.loc[row, "pvalue"] == pytest.approx(f_ref.pvalue)
+        assert kruskal.loc[row, "h_stat"] == pytest.approx(h_ref.statistic)
+        assert kruskal.loc[row, "pvalue"] == pytest.approx(h_ref.pvalue)
+
+    # Um único grupo não permite o teste.
+    assert np.isnan(anova.loc[1, "f_stat"])
+    assert np.isnan(kruskal.loc[1, "pvalue"])
+
+
+def test_frequency_weights_match_expanded_data():
+    a, counts_a = np.array([1.0, 2.0, 4.0]), np.array([5, 2, 3])
+    b, counts_b = np.array([2.0, 3.0, 6.0, 7.0]), np.array([1, 4, 2, 2])
+    a_full, b_full = np.repeat(a, counts_a), np.repeat(b, counts_b)
+
+    weighted = hypothesis.two_sample_ttest(a, b, weights_a=counts_a, weights_b=counts_b)
+    expanded = hypothesis.two_sample_ttest(a_full, b_full)
+    assert weighted.statistic == pytest.approx(expanded.statistic)
+    assert weighted.pvalue == pytest.approx(expanded.pvalue)
+    # Tipos documentados: só o caminho sem pesos traz `df`.
+    assert hasattr(expanded, "df") and not hasattr(weighted, "df")
+    stat, pvalue = weighted
+
+    weighted = hypothesis.permutation_test(
+        a, b, n_permutations=2_000, weights_a=counts_a, weights_b=counts_b, seed=1
+    )
+    expanded = hypothesis.permutation_test(a_full, b_full, n_permutations=2_000, seed=1)
+    assert weighted[0] == pytest.approx(expanded[0])
+    assert weighted[1] == pytest.approx(expanded[1], abs=0.05)
+
+    frame = pd.DataFrame(
+        {
+            "group": ["x"] * 3 + ["y"] * 4,
+            "value": np.concatenate([a, b]),
+            "count": np.concatenate([counts_a, counts_b]),
+        }
+    )
+    full = frame.loc[frame.index.repeat(frame["count"])]
+    for test in (hypothesis.anova_by, hypothesis.kruskal_by):
+        weighted = test(frame, "value", "group", None, weight="count")
+        expanded = test(full, "value", "group", None)
+        assert weighted["n_obs"][0] == expanded["n_obs"][0]
+        assert weighted["pvalue"][0] == pytest.approx(expanded["pvalue"][0])
+
+
+def test_permutation_test_is_stable_with_large_offset():
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(0.0, 1.0, 40), rng.normal(0.5, 1.0, 40)
+    counts = rng.integers(1, 4, size=40)
+
+    for weights in (None, counts):
+        shifted = hypothesis.permutation_test(
+            a + 1e8, b + 1e8, statistic="t", seed=2, weights_a=weights
+        )
+        centered = hypothesis.permutation_test(
+            a, b, statistic="t", seed=2, weights_a=weights
+        )
+        assert shifted[0] == pytest.approx(centered[0], rel=1e-6)
+        assert shifted[1] == pytest.approx(centered[1])
+
+
+def test_permutation_test_without_finite_statistic_has_no_pvalue():
+    # Um NaN não pode virar um p-valor mínimo ("altamente significativo").
+    a, b = np.array([1.0, 2.0, np.nan, 4.0]), np.array([2.0, 3.0, 5.0])
+    stat, pvalue = hypothesis.permutation_test(a, b, n_permutations=200, seed=0)
+    assert np.isnan(stat) and np.isnan(pvalue)
+
+    # Dados constantes: t indefinido, como em two_sample_ttest.
+    const = np.full(5, 3.0)
+    stat, pvalue = hypothesis.permutation_test(
+        const, const, statistic="t", n_permutations=200, seed=0
+    )
+    assert np.isnan(stat) and np.isnan(pvalue)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests for the opt-in instrumentation layer."""
+import numpy as np
+import pytest
+
+from src import instrumentation
+from src.models.evaluate import classification_report_proba
+from src.stats import hypothesis, probability
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation.reset()
+    probability.sample_mean([1.0, 2.0])
+    assert instrumentation.snapshot() == {}
+
+
+def test_spans_record_calls_sizes_and_copies(enabled):
+    a = np.arange(10.0)
+    hypothesis.two_sample_ttest(a, a + 1)
+    hypothesis.two_sample_ttest(a, a + 2)
+    probability.sample_mean([1.0, 2.0, 3.0])
+    classification_report_proba([0, 1, 1], [[0.9, 0.1], [0.2, 0.8], [0.4, 0.6]])
+
+    spans = instrumentation.snapshot()
+
+    assert spans["stats.two_sample_ttest"]["calls"] == 2
+    assert spans["stats.two_sample_ttest"]["items"] == 40
+    assert spans["scipy.ttest_ind"]["calls"] == 2
+    assert spans["stats.sample_mean"]["bytes_copied"] == 24
+    assert spans["evaluate._ensure_1d_proba"]["bytes_copied"] == 48
+    assert spans["sklearn.roc_auc_score"]["wall_seconds"] >= 0
+
+
+def test_exports_json_and_prometheus(enabled, tmp_path):
+    probability.normal_cdf(0.5)
+
+    json_path = instrumentation.export_json(tmp_path / "spans.json")
+    prom_path = instrumentation.export_prometheus(tmp_path / "spans.prom")
+
+    assert "stats.normal_cdf" in json_path.read_text(encoding="utf-8")
+    text = prom_path.read_text(encoding="utf-8")
+    assert "# TYPE src_span_calls_total counter" in text
+    assert 'src_span_calls_total{span="stats.normal_cdf"} 1' in text
+
+
+def test_profile_dumps_stats(tmp_path):
+    output = tmp_path / "run.prof"
+    with instrumentation.profile(output):
+        probability.sample_mean(range(100))
+    assert output.stat().st_size > 0
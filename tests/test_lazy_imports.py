@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Importing the src modules must not load their heavy dependencies."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.suite import LAZY_IMPORTS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize("module", sorted(LAZY_IMPORTS))
+def test_import_is_lazy(module):
+    forbidden = LAZY_IMPORTS[module]
+    code = (
+        f"import sys, {module}; "
+        f"print([m for m in {forbidden!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_scipy_loads_on_first_call():
+    code = (
+        "import sys, src.stats.probability as p; "
+        "p.normal_cdf(0.0); print('scipy' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.stdout.strip() == "True"
@@ -69,4 +69,73 @@ def test_load_nyc_311_respects_limit(temp_data_dirs):
     assert captured["params"] == {"": 42}
     assert captured["timeout"] == 180
     assert df.iloc[0]["complaint_type"] == "Noise"
-    assert (external_dir / "nyc_311.csv").exists()
\ No newline at end of file
+    partition = external_dir / "nyc_311" / "created_month=unknown"
+    assert list(partition.glob("borough=Unspecified/*.parquet"))
+
+    # Baixar de novo os mesmos dados não duplica as linhas.
+    loaders.load_nyc_311(limit=42, request_fn=fake_request)
+    assert len(loaders.read_nyc_311()) == 1
+
+
+def test_iter_csv_chunks_splits_rows(tmp_path):
+    path = tmp_path / "values.csv"
+    pd.DataFrame({"value": range(10)}).to_csv(path, index=False)
+
+    chunks = list(loaders.iter_csv_chunks(path, chunksize=4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+    with pytest.raises(ValueError):
+        next(loaders.iter_csv_chunks(path, chunksize=0))
+
+
+def _nyc_frame(dates, boroughs):
+    return pd.DataFrame(
+        {
+            "unique_key": range(len(dates)),
+            "created_date": dates,
+            "borough": boroughs,
+        }
+    )
+
+
+def test_nyc_311_partitions_prune_and_append(temp_data_dirs):
+    _, external_dir, _ = temp_data_dirs
+    first = _nyc_frame(
+        ["2024-01-05T10:00:00", "2024-01-20T08:30:00", "2024-02-01T00:00:00"],
+        ["BRONX", "QUEENS", "BRONX"],
+    )
+    loaders.write_nyc_311(first)
+    old_files = sorted((external_dir / "nyc_311").rglob("*.parquet"))
+    assert len(old_files) == 3
+
+    # Append: novos arquivos, os antigos ficam intactos.
+    loaders.write_nyc_311(_nyc_frame(["2024-03-02T12:00:00"], [None]))
+    files = sorted((external_dir / "nyc_311").rglob("*.parquet"))
+    assert len(files) == 4 and set(old_files) <= set(files)
+
+    # Um arquivo corrompido fora do filtro prova que ele nem é aberto.
+    assert old_files[2].parent.parent.name == "created_month=2024-02"
+    old_files[2].write_bytes(b"not parquet")
+    jan = loaders.read_nyc_311(months=["2024-01"], columns=["unique_key", "borough"])
+    assert sorted(jan["unique_key"]) == ["0", "1"]
+    assert set(jan["borough"]) == {"BRONX", "QUEENS"}
+    march = loaders.read_nyc_311(months=["2024-03"], boroughs=["Unspecified"])
+    assert len(march) == 1
+
+    loaders.write_nyc_311(first.iloc[:1], mode="replace")
+    assert len(loaders.read_nyc_311(months=["2024-01"], boroughs=["BRONX"])) == 1
+    with pytest.raises(ValueError):
+        loaders.write_nyc_311(first, mode="overwrite")
+
+
+def test_nyc_311_appends_with_different_inferred_dtypes(temp_data_dirs):
+    first = _nyc_frame(["2024-01-05T10:00:00"], ["BRONX"]).assign(x=5)
+    second = _nyc_frame(["2024-01-06T10:00:00"], ["BRONX"]).assign(x="abc", y=[1.5])
+    loaders.write_nyc_311(first)
+    loaders.write_nyc_311(second, mode="append")
+
+    df = loaders.read_nyc_311().sort_values("created_date")
+
+    assert list(df["x"]) == ["5", "abc"]
+    assert df["y"].isna().tolist() == [True, False]
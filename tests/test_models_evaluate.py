@@ -3,7 +3,11 @@
 import numpy as np
 import pytest
 
-from src.models.evaluate import classification_report_proba
+from src.models.evaluate import (
+    CalibrationAccumulator,
+    calibration_report,
+    classification_report_proba,
+)
 
 
 def test_classification_report_proba_supports_two_columns():
@@ -30,4 +34,65 @@ def test_classification_report_proba_validates_threshold():
 
 def test_classification_report_proba_size_mismatch():
     with pytest.raises(ValueError):
-        classification_report_proba([0, 1], [0.1])
\ No newline at end of file
+        classification_report_proba([0, 1], [0.1])
+
+
+def test_classification_report_proba_frequency_weights():
+    y_true = np.array([0, 1, 1, 0, 1])
+    y_proba = np.array([0.2, 0.7, 0.4, 0.5, 0.9])
+    counts = np.array([3, 1, 2, 4, 1])
+
+    weighted = classification_report_proba(y_true, y_proba, sample_weight=counts)
+    expanded = classification_report_proba(
+        np.repeat(y_true, counts), np.repeat(y_proba, counts)
+    )
+
+    assert weighted["auc"] == pytest.approx(expanded["auc"])
+    assert weighted["brier"] == pytest.approx(expanded["brier"])
+    with pytest.raises(ValueError):
+        classification_report_proba(y_true, y_proba, sample_weight=[1, 2])
+
+
+def test_calibration_accumulator_matches_sklearn_in_chunks():
+    from sklearn.calibration import calibration_curve
+    from sklearn.metrics import brier_score_loss
+
+    rng = np.random.default_rng(0)
+    y_proba = rng.uniform(size=20_000)
+    y_true = (rng.uniform(size=y_proba.size) < y_proba**1.5).astype(int)
+
+    left, right = CalibrationAccumulator(10), CalibrationAccumulator(10)
+    for chunk in np.array_split(np.arange(10_000), 4):
+        left.update(y_true[chunk], y_proba[chunk])
+    right.update(y_true[10_000:], y_proba[10_000:])
+    merged = left.merge(right)
+
+    table = merged.reliability_table()
+    observed, predicted = calibration_curve(y_true, y_proba, n_bins=10)
+    np.testing.assert_allclose(table["observed_rate"], observed)
+    np.testing.assert_allclose(table["mean_proba"], predicted)
+
+    report = merged.report()
+    assert report["brier"] == pytest.approx(brier_score_loss(y_true, y_proba))
+    assert report["ece"] == pytest.approx(
+        np.sum(table["count"] * np.abs(table["gap"])) / y_true.size
+    )
+    assert report["mce"] == pytest.approx(np.abs(table["gap"]).max())
+    assert report == pytest.approx(calibration_report(y_true, y_proba))
+
+
+def test_brier_decomposition_is_exact_for_constant_bins():
+    y_true = np.array([0, 0, 1, 1, 1, 0])
+    y_proba = np.array([0.25, 0.25, 0.25, 0.75, 0.75, 0.75])
+
+    parts = calibration_report(y_true, y_proba, bins=[0.0, 0.5, 1.0])
+
+    recomposed = parts["reliability"] - parts["resolution"] + parts["uncertainty"]
+    assert recomposed == pytest.approx(parts["brier"])
+    assert parts["within_bin"] == pytest.approx(0.0, abs=1e-12)
+    with pytest.raises(ValueError):
+        CalibrationAccumulator([0.0, 0.7, 0.5, 1.0])
+    with pytest.raises(ValueError):
+        CalibrationAccumulator(4).merge(CalibrationAccumulator(5))
+    with pytest.raises(ValueError):
+        CalibrationAccumulator(4).update([0, 2], [0.1, 0.2])
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tests for the streaming scoring pipeline."""
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.pipeline import score_in_batches
+
+
+class ThresholdModel:
+    def predict_proba(self, X):
+        p = 1 / (1 + np.exp(-X["x"].to_numpy()))
+        return np.column_stack([1 - p, p])
+
+
+def _chunks(n_chunks=5, size=20, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_chunks):
+        x = rng.normal(size=size)
+        yield pd.DataFrame({"x": x, "y": (x > 0).astype(int)})
+
+
+def test_score_in_batches_writes_parts_and_metrics(tmp_path):
+    result = score_in_batches(
+        _chunks(),
+        ThresholdModel(),
+        target="y",
+        output_dir=tmp_path,
+        queue_size=2,
+    )
+
+    assert result["rows"] == 100
+    assert len(result["files"]) == 5
+    written = pd.concat(pd.read_parquet(path) for path in result["files"])
+    assert list(written.columns) == ["proba", "y"]
+    assert result["metrics"]["auc"] == pytest.approx(1.0)
+    assert result["calibration"]["brier"] == pytest.approx(result["metrics"]["brier"])
+    stages = {s["stage"]: s for s in result["stages"]}
+    assert set(stages) == {"load", "preprocess", "features", "predict", "write"}
+    assert stages["predict"]["chunks"] == 5
+
+
+def test_score_in_batches_applies_preprocess_and_propagates_errors():
+    result = score_in_batches(
+        _chunks(n_chunks=2),
+        ThresholdModel(),
+        preprocess_fn=lambda df: df[df["x"] > 0],
+        feature_fn=lambda df: df[["x"]],
+    )
+    assert result["metrics"] is None
+    assert result["calibration"] is None
+    assert result["rows"] < 40
+
+    def boom(df):
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        score_in_batches(_chunks(n_chunks=20), ThresholdModel(), preprocess_fn=boom)
+
+
+def _score_with_timeout(chunks, timeout=60):
+    # Roda em uma thread daemon para que um travamento falhe o teste.
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = score_in_batches(
+                chunks, ThresholdModel(), target="y", queue_size=1
+            )
+        except Exception as exc:  # noqa: BLE001 - verificado pelo teste
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "score_in_batches travou"
+    return outcome
+
+
+def test_score_in_batches_non_binary_labels_do_not_hang():
+    def relabel(mapping):
+        for chunk in _chunks(n_chunks=50):
+            yield chunk.assign(y=chunk["y"].map(mapping))
+
+    outcome = _score_with_timeout(relabel({0: 1, 1: 2}))
+    assert outcome["result"]["metrics"]["auc"] == pytest.approx(1.0)
+    assert outcome["result"]["calibration"] is None
+
+    outcome = _score_with_timeout(relabel({0: "No", 1: "Yes"}))
+    assert isinstance(outcome["error"], ValueError)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Tests for the power analysis module."""
+import numpy as np
+import pytest
+
+from src.stats import power
+
+
+def test_ttest_power_and_sample_size_are_consistent():
+    # Referência clássica: d = 0.5, alpha = 0.05, poder 0.8 -> 64 por grupo.
+    assert power.ttest_sample_size(0.5) == 64
+    assert power.ttest_power(0.5, 64) == pytest.approx(0.8015, abs=1e-4)
+
+    effect = np.array([0.2, 0.5, 0.8])[:, None, None]
+    alpha = np.array([0.01, 0.05])[:, None]
+    ratio = np.array([1.0, 2.0, 3.0])
+    n1 = power.ttest_sample_size(effect, alpha, 0.9, ratio)
+
+    assert n1.shape == (3, 2, 3)
+    achieved = power.ttest_power(effect, n1, alpha, ratio)
+    assert np.all(achieved >= 0.9)
+    assert np.all(power.ttest_power(effect, n1 - 1, alpha, ratio) < 0.9)
+
+
+def test_sample_size_unreachable_and_invalid_inputs():
+    n1 = power.ttest_sample_size([0.0, -0.5, 0.5], alternative="greater")
+    assert np.isnan(n1[:2]).all() and n1[2] == 51
+
+    with pytest.raises(ValueError):
+        power.ttest_sample_size(0.5, alpha=1.5)
+    with pytest.raises(ValueError):
+        power.ttest_power(0.5, 10, alternative="bigger")
+
+
+def test_chi2_sample_size_matches_power():
+    n = power.chi2_sample_size(np.array([0.1, 0.3, 0.5]), df=3)
+
+    assert n[1] == 122
+    assert np.all(power.chi2_power([0.1, 0.3, 0.5], n, 3) >= 0.8)
+    assert np.all(power.chi2_power([0.1, 0.3, 0.5], n - 1, 3) < 0.8)
@@ -1,6 +1,7 @@
 ﻿# -*- coding: utf-8 -*-
 """Tests for probability utilities."""
 import math
+import warnings
 
 import numpy as np
 import pytest
@@ -36,4 +37,114 @@ def test_sample_mean_ignores_nan():
     assert result == pytest.approx(2.0)
 
     with pytest.raises(ValueError):
-        probability.sample_mean([])
\ No newline at end of file
+        probability.sample_mean([])
+
+
+def test_sample_mean_with_frequency_weights():
+    values = [1.0, 2.0, np.nan, 5.0]
+    counts = [3, 1, 4, 2]
+    expanded = np.repeat(values, counts)
+
+    assert probability.sample_mean(values, weights=counts) == pytest.approx(
+        np.nanmean(expanded)
+    )
+
+    with pytest.raises(ValueError):
+        probability.sample_mean(values, weights=[1, 2])
+    with pytest.raises(ValueError):
+        probability.sample_mean(values, weights=[1, -1, 1, 1])
+
+
+def test_quantile_sketch_rank_error_and_merge():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=200_000)
+    qs = np.array([0.01, 0.5, 0.95, 0.99])
+    ordered = np.sort(values)
+
+    left = probability.QuantileSketch(compression=100)
+    right = probability.QuantileSketch(compression=100)
+    for chunk in np.array_split(values[:100_000], 10):
+        left.update(chunk)
+    right.update(values[100_000:])
+    restored = probability.QuantileSketch.from_bytes(right.to_bytes())
+    sketch = left.merge(restored)
+
+    assert len(sketch) <= 101
+    assert sketch.count == values.size
+    ranks = np.searchsorted(ordered, sketch.quantile(qs)) / values.size
+    assert np.all(np.abs(ranks - qs) < 0.005)
+    assert sketch.quantile(0.0) == values.min()
+    assert sketch.quantile(1.0) == values.max()
+    assert sketch.cdf(np.median(values)) == pytest.approx(0.5, abs=0.005)
+
+
+def test_quantile_sketch_weights_and_errors():
+    sketch = probability.QuantileSketch().update([1.0, 2.0, np.nan], weights=[3, 1, 5])
+    assert sketch.count == 4
+    assert sketch.quantile(0.25) == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        probability.QuantileSketch().quantile(0.5)
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+
+
+def test_binomial_and_poisson_match_scipy():
+    from scipy import stats
+
+    k = np.arange(-1, 40)
+    np.testing.assert_allclose(
+        probability.binomial_pmf(k, 30, 0.4), stats.binom.pmf(k, 30, 0.4), atol=1e-14
+    )
+    np.testing.assert_allclose(
+        probability.binomial_cdf(k, 30, 0.4), stats.binom.cdf(k, 30, 0.4), atol=1e-14
+    )
+    np.testing.assert_allclose(
+        probability.poisson_sf(k, 6.5), stats.poisson.sf(k, 6.5), atol=1e-14
+    )
+    # Log-space keeps large n from underflowing.
+    assert probability.binomial_logpmf(10**6, 2 * 10**6, 0.5) == pytest.approx(
+        stats.binom.logpmf(10**6, 2 * 10**6, 0.5)
+    )
+
+    with pytest.raises(ValueError):
+        probability.binomial_pmf(1, 10, 1.5)
+    with pytest.raises(ValueError):
+        probability.poisson_cdf(1, -1.0)
+
+
+def test_discrete_tables_are_cached_lookups():
+    table = probability.binomial_table(20, 0.25)
+    assert probability.binomial_table(20, 0.25) is table
+    assert table.k_max == 20
+
+    k = np.array([-1, 0, 5, 20, 25])
+    np.testing.assert_allclose(table.cdf(k), probability.binomial_cdf(k, 20, 0.25))
+    assert table.sf(25) == 0.0
+    with pytest.raises(ValueError):
+        table.pmf_values[0] = 1.0
+
+    poisson = probability.poisson_table(3.0)
+    assert poisson.sf(poisson.k_max) < 1e-15
+    assert poisson.pmf(4) == pytest.approx(probability.poisson_pmf(4, 3.0))
+
+
+def test_discrete_tables_match_functions_off_the_integers():
+    table = probability.binomial_table(5, 0.3)
+    k = np.array([-0.5, 0.0, 2.5, 4.99, 5.5])
+    np.testing.assert_allclose(table.pmf(k), probability.binomial_pmf(k, 5, 0.3))
+    np.testing.assert_allclose(table.cdf(k), probability.binomial_cdf(k, 5, 0.3))
+    np.testing.assert_allclose(table.sf(k), probability.binomial_sf(k, 5, 0.3))
+    assert table.pmf(2.5) == 0.0
+
+
+def test_nan_k_propagates_without_cast_warnings():
+    table = probability.binomial_table(10, 0.5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for fn in (probability.binomial_cdf, probability.binomial_sf):
+            assert np.isnan(fn(np.nan, 10, 0.5))
+            np.testing.assert_array_equal(
+                np.isnan(fn(np.array([np.nan, 3.0]), 10, 0.5)), [True, False]
+            )
+        assert np.isnan(table.cdf(np.nan)) and np.isnan(table.sf(np.nan))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Tests for the opt-in stats memoization."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.stats import cache, hypothesis
+
+
+@pytest.fixture
+def enabled_cache():
+    cache.clear()
+    cache.enable(maxsize=2, directory=None)
+    yield cache
+    cache.disable()
+    cache.clear()
+
+
+def test_cache_is_off_by_default():
+    assert not cache.is_enabled()
+    hypothesis.chi_square_independence(np.array([[10, 20], [20, 10]]))
+    assert cache.stats()["misses"] == 0
+
+
+def test_hits_are_keyed_by_content_and_parameters(enabled_cache):
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=(2, 500))
+
+    first = hypothesis.two_sample_ttest(a, b)
+    # Mesmo conteúdo em outro buffer e o valor padrão explícito: acerto.
+    again = hypothesis.two_sample_ttest(a.copy(), b.tolist(), equal_var=False)
+    assert again.statistic == first.statistic
+    hypothesis.two_sample_ttest(a, b, equal_var=True)
+    b[0] += 1.0
+    hypothesis.two_sample_ttest(a, b)
+
+    counters = cache.stats()
+    assert counters["hits"] == 1
+    assert counters["misses"] == 3
+    assert counters["evictions"] == 1
+    assert counters["size"] == 2
+
+
+def test_results_are_copies_and_random_calls_bypass(enabled_cache):
+    table = np.array([[10, 20], [20, 10]])
+    expected = hypothesis.chi_square_independence(table)[3]
+    expected[0, 0] = -1.0
+    assert hypothesis.chi_square_independence(table)[3][0, 0] == 15.0
+
+    hypothesis.permutation_test([1.0, 2.0, 3.0], [4.0, 5.0], n_permutations=50)
+    assert cache.stats()["bypassed"] == 1
+
+    frame = pd.DataFrame({"g": ["x", "x", "y", "y"], "v": [1.0, 2.0, 5.0, 6.0]})
+    hypothesis.anova_by(frame, "v", "g", None)
+    hypothesis.anova_by(frame.copy(), "v", "g", None)
+    assert cache.stats()["hits"] == 2
+
+
+def test_disk_tier_is_shared(enabled_cache, tmp_path):
+    cache.enable(directory=tmp_path)
+    table = np.array([[5, 9], [8, 3]])
+    hypothesis.chi_square_independence(table)
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    cache.clear()
+    chi2 = hypothesis.chi_square_independence(table)[0]
+    assert cache.stats()["disk_hits"] == 1
+    assert chi2 == pytest.approx(
+        hypothesis.chi_square_independence.__wrapped__(table)[0]
+    )
+
+
+def test_enable_keeps_settings_not_passed(enabled_cache, tmp_path):
+    cache.enable(directory=tmp_path)
+    cache.enable()
+    assert cache.stats()["maxsize"] == 2
+    hypothesis.chi_square_independence(np.array([[5, 9], [8, 3]]))
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+
+def test_ttest_reaches_disk_tier(enabled_cache, tmp_path):
+    cache.enable(directory=tmp_path)
+    a, b = [1.0, 2.0, 3.0, 4.0], [2.5, 3.5, 5.0, 6.0]
+    fresh = hypothesis.two_sample_ttest(a, b)
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+    assert cache.stats()["memory_only"] == 0
+
+    cache.clear()
+    stat, pvalue = hypothesis.two_sample_ttest(a, b)
+    cached = hypothesis.two_sample_ttest(a, b)
+    assert cache.stats()["disk_hits"] == 1
+    assert (stat, pvalue) == pytest.approx((fresh.statistic, fresh.pvalue))
+    assert cached.df == pytest.approx(fresh.df)
+
+
+def test_cache_keeps_the_scipy_result_type(enabled_cache, tmp_path):
+    # Ligar o cache não pode mudar a API do resultado, nem no miss nem no hit.
+    cache.enable(directory=tmp_path)
+    a, b = [1.0, 2.0, 3.0, 4.0], [2.5, 3.5, 5.0, 6.0]
+    expected = hypothesis.two_sample_ttest.__wrapped__(a, b)
+    miss = hypothesis.two_sample_ttest(a, b)
+    cache.clear()
+    hit = hypothesis.two_sample_ttest(a, b)
+    assert cache.stats()["disk_hits"] == 1
+    for result in (miss, hit):
+        assert type(result) is type(expected)
+        assert tuple(result.confidence_interval()) == pytest.approx(
+            tuple(expected.confidence_interval())
+        )
+
+
+def test_key_covers_module_source_and_versions(enabled_cache, tmp_path, monkeypatch):
+    # A chave usa o módulo inteiro: mudar um helper como _permutation_batch
+    # também invalida permutation_test.
+    assert cache._source_hash(hypothesis.permutation_test) == cache._source_hash(
+        hypothesis._permutation_batch
+    )
+    assert cache._source_hash(hypothesis.permutation_test) != cache._source_hash(
+        cache.enable
+    )
+    assert "scipy=" in cache._environment()
+
+    cache.enable(directory=tmp_path)
+
+    def double(x):
+        return 2 * x
+
+    def triple(x):
+        return 3 * x
+
+    assert cache.memoized("double")(double)(2) == 4
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    cache._environment.cache_clear()
+    try:
+        # Mesmo nome, versão nova: o pickle antigo não é servido.
+        assert cache.memoized("double")(triple)(2) == 6
+    finally:
+        monkeypatch.undo()
+        cache._environment.cache_clear()
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
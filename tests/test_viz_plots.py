@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Tests for the plotting helpers."""
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+from sklearn.metrics import roc_auc_score  # noqa: E402
+
+from src.viz import plots  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def close_figures():
+    yield
+    plt.close("all")
+
+
+def test_stratified_sample_keeps_rare_groups():
+    strata = np.array(["a"] * 9_990 + ["b"] * 10)
+
+    idx = plots.stratified_sample(strata.size, 100, strata=strata)
+
+    assert 100 <= idx.size <= 101
+    assert "b" in set(strata[idx])
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_stratified_sample_is_bounded_by_max_points():
+    rng = np.random.default_rng(1)
+    # Mais grupos que max_points: um ponto de cada grupo sorteado.
+    many = rng.integers(0, 50_000, size=200_000)
+    idx = plots.stratified_sample(many.size, 1_000, strata=many)
+    assert idx.size == 1_000
+    assert np.unique(many[idx]).size == 1_000
+
+    # Muitos grupos pequenos, mas menos que max_points.
+    few = np.repeat(np.arange(600), 5)
+    few[:1_000] = -1
+    idx = plots.stratified_sample(few.size, 700, strata=few)
+    assert idx.size == 700
+    assert np.unique(few[idx]).size == np.unique(few).size
+
+
+def test_large_scatter_renders_density_image():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=(2, 200_000))
+
+    ax = plots.scatter_plot(x, y, max_points=1_000, gridsize=50)
+
+    assert len(ax.collections) == 1
+    assert ax.collections[0].get_array().size == 50 * 50
+
+
+def test_ecdf_and_hist_are_bounded_by_bins():
+    values = np.random.default_rng(1).exponential(size=100_000)
+
+    ax = plots.ecdf_plot(values, max_points=500)
+    xs, ys = ax.lines[0].get_data()
+    assert xs.size == 500
+    assert ys[-1] == pytest.approx(1.0)
+
+    ax = plots.hist_plot(values, bins=30)
+    assert len(ax.patches) == 1
+
+
+def test_binned_roc_curve_matches_sklearn_auc():
+    rng = np.random.default_rng(2)
+    y_true = rng.integers(0, 2, size=50_000)
+    y_score = np.clip(0.3 * y_true + rng.normal(0.35, 0.2, size=y_true.size), 0, 1)
+
+    fpr, tpr = plots.binned_roc_curve(y_true, y_score, bins=2_000)
+    auc = np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)
+
+    assert fpr.size == 2_001
+    assert auc == pytest.approx(roc_auc_score(y_true, y_score), abs=1e-3)
+    plots.roc_curve_plot(y_true, y_score)
+    plots.residual_plot(y_score, y_true)
+
+
+def test_render_figures_skips_unchanged_specs(tmp_path):
+    values = np.arange(1_000, dtype=float)
+    specs = [
+        plots.FigureSpec("hist", "hist", {"values": values}, formats=("png", "svg")),
+        plots.FigureSpec("ecdf", "ecdf", {"values": values}, {"max_points": 100}),
+    ]
+
+    first = plots.render_figures(specs, tmp_path, max_workers=2)
+    assert first["rendered"] == ["ecdf", "hist"]
+    assert (tmp_path / "hist.svg").exists()
+    assert (tmp_path / "ecdf.png").exists()
+
+    specs[0].data["values"] = values + 1
+    second = plots.render_figures(specs, tmp_path, max_workers=2)
+    assert second["rendered"] == ["hist"]
+    assert second["skipped"] == ["ecdf"]
+
+    with pytest.raises(ValueError):
+        plots.render_figures([plots.FigureSpec("x", "pie", {})], tmp_path)
+
+
+def test_spec_hash_covers_array_options():
+    strata = np.arange(5_000) % 7
+    changed = strata.copy()
+    changed[2_500] += 1
+    values = np.zeros(5_000)
+
+    def spec(labels):
+        return plots.FigureSpec(
+            "s", "scatter", {"x": values, "y": values}, {"strata": labels}
+        )
+
+    # O repr do NumPy abrevia arrays longos com "..."; o hash não pode.
+    assert plots.spec_hash(spec(strata)) != plots.spec_hash(spec(changed))
+    assert plots.spec_hash(spec(strata)) == plots.spec_hash(spec(strata.copy()))
+    with pytest.raises(ValueError):
+        plots.spec_hash(spec(object()))